@@ -1,4 +1,4 @@
-const { predictAQI, predictWater, predictHealth } = require('../services/mlServiceClient');
+const { predictAQI, predictWater, predictHealth, predictSnapshot } = require('../services/mlServiceClient');
 
 /**
  * Forecast Engine
@@ -216,23 +216,42 @@ const mockForecast = (historicalData, days = DEFAULT_FORECAST_DAYS) => {
     };
 };
 
+/**
+ * AQI, water and health predictions for one forecast in a single round-trip to
+ * /predict/snapshot, which runs the pipelines concurrently in the ML service.
+ * If the snapshot call itself fails (e.g. an ML service without the endpoint),
+ * each pipeline is requested on its own instead. A pipeline that failed inside
+ * the snapshot resolves to null, like a failed single call.
+ */
+const fetchMLPredictions = async (payloads) => {
+    const snapshot = await predictSnapshot(payloads);
+    if (snapshot) {
+        return [snapshot.aqi || null, snapshot.water || null, snapshot.health || null];
+    }
+    return Promise.all([
+        predictAQI(payloads.aqi),
+        predictWater(payloads.water),
+        predictHealth(payloads.health),
+    ]);
+};
+
 const generateForecast = async (historicalData, days = DEFAULT_FORECAST_DAYS) => {
     const mlEnabled = process.env.ML_ENABLED === 'true';
 
     if (mlEnabled) {
         const latest = historicalData[historicalData.length - 1] || {};
 
-        const [aqiResult, waterResult, healthResult] = await Promise.all([
-            predictAQI({ days }),
-            predictWater({ days }),
-            predictHealth({
+        const [aqiResult, waterResult, healthResult] = await fetchMLPredictions({
+            aqi: { days },
+            water: { days },
+            health: {
                 aqi: latest.aqi || 100,
                 temperature: latest.temperature || 30.0,
                 humidity: 60.0,
                 population_density: 5000.0,
                 water_quality_index: latest.water_quality || 50.0
-            })
-        ]);
+            }
+        });
 
         if (aqiResult && waterResult && healthResult) {
             return transformNewMLResponse(aqiResult, waterResult, healthResult);
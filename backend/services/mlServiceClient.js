@@ -50,6 +50,21 @@ const predictHealth = (payload) => callMLEndpoint('/predict/health', payload);
 const predictForest = (payload) => callMLEndpoint('/predict/forest', payload);
 const predictTraffic = (payload) => callMLEndpoint('/predict/traffic', payload);
 
+/**
+ * Batch variants: take an array of payloads and resolve to
+ * `{ predictions: [...] }` in input order, using one model call per batch.
+ */
+const predictHealthBatch = (payloads) => callMLEndpoint('/predict/health/batch', payloads);
+const predictForestBatch = (payloads) => callMLEndpoint('/predict/forest/batch', payloads);
+const predictTrafficBatch = (payloads) => callMLEndpoint('/predict/traffic/batch', payloads);
+
+/**
+ * All five pipelines in one call, run concurrently by the ML service.
+ * @param {Object} payload - { aqi, water, health, forest, traffic, zone? }; omitted sections are skipped
+ * @returns {Promise<Object|null>} the per-pipeline results plus `timings` and `errors` for partial failures
+ */
+const predictSnapshot = (payload) => callMLEndpoint('/predict/snapshot', payload);
+
 /**
  * Check if the ML service is healthy.
  * @returns {Promise<boolean>}
@@ -110,6 +125,10 @@ module.exports = {
     predictHealth,
     predictForest,
     predictTraffic,
+    predictHealthBatch,
+    predictForestBatch,
+    predictTrafficBatch,
+    predictSnapshot,
     checkMLHealth,
     fetchDeforestationData,
     compareDeforestationStates,
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: DataFrame + model.predict versus the compiled float32 feature path.
+
+Run from smart_city_ml/:
+    python -m benchmarks.feature_path [--models-dir models] [--repeat 2000]
+"""
+import argparse
+import os
+import timeit
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from schemas.prediction import HealthPredictionRequest, ForestPredictionRequest, TrafficPredictionRequest
+from services.feature_schema import FEATURE_SCHEMAS, CompiledModel
+
+SAMPLE_REQUESTS = {
+    "health_model": ("health.pkl", HealthPredictionRequest(
+        aqi=120, temperature=30, humidity=50, population_density=1100, water_quality_index=60)),
+    "forest_model": ("forest.pkl", ForestPredictionRequest(
+        rainfall=3, urban_expansion_rate=1, previous_forest_area=105000)),
+    "traffic_model": ("traffic.pkl", TrafficPredictionRequest(
+        time_of_day=12, day_of_week=2, vehicle_count=300, weather=25)),
+}
+
+def _dataframe_predict(model, schema, requests):
+    """The previous router path: one dict per row, columns named as the model was trained."""
+    columns = model.get_booster().feature_names or schema.fields
+    rows = [dict(zip(columns, (getattr(r, f) for f in schema.fields))) for r in requests]
+    return model.predict(pd.DataFrame(rows))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    print(f"{'model':<14} {'rows':>5} {'dataframe us/call':>18} {'compiled us/call':>17} {'speedup':>8}")
+    for model_name, (filename, request) in SAMPLE_REQUESTS.items():
+        path = os.path.join(args.models_dir, filename)
+        if not os.path.exists(path):
+            print(f"{model_name:<14} skipped, {path} missing")
+            continue
+        model = joblib.load(path)
+        schema = FEATURE_SCHEMAS[model_name]
+        compiled = CompiledModel(model, schema)
+
+        for n_rows in (1, 64):
+            requests = [request] * n_rows
+            assert np.allclose(_dataframe_predict(model, schema, requests), compiled.predict(requests), atol=1e-4)
+
+            before = timeit.timeit(lambda: _dataframe_predict(model, schema, requests), number=args.repeat)
+            after = timeit.timeit(lambda: compiled.predict(requests), number=args.repeat)
+            before_us = before / args.repeat * 1e6
+            after_us = after / args.repeat * 1e6
+            print(f"{model_name:<14} {n_rows:>5} {before_us:>18.1f} {after_us:>17.1f} {before_us / after_us:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
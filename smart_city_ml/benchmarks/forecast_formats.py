@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: serializing a forecast slice through per-row pydantic points versus the columnar formats.
+
+Run from smart_city_ml/:
+    python -m benchmarks.forecast_formats [--days 365] [--repeat 200]
+"""
+import argparse
+import json
+import timeit
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from schemas.prediction import AQIForecastPoint, AQIPredictionResponse
+from services import forecast_format
+from services.forecast_format import COLUMNAR_JSON, NDJSON, ARROW_STREAM, forecast_response, to_output_frame
+
+def _forecast_frame(days: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    yhat = 150.0 + rng.normal(0, 10, days)
+    return pd.DataFrame({
+        "ds": pd.date_range("2024-01-01", periods=days, freq="D"),
+        "yhat": yhat,
+        "yhat_lower": yhat - 15.0,
+        "yhat_upper": yhat + 15.0,
+    })
+
+def _iterrows_json(forecast: pd.DataFrame) -> str:
+    """The previous router path: one pydantic point per row, then FastAPI's JSON encoder."""
+    points = [
+        AQIForecastPoint(
+            date=row['ds'].strftime("%Y-%m-%d"),
+            prediction=round(row['yhat'], 2),
+            lower_bound=round(row['yhat_lower'], 2),
+            upper_bound=round(row['yhat_upper'], 2),
+        )
+        for _, row in forecast.iterrows()
+    ]
+    return json.dumps(jsonable_encoder(AQIPredictionResponse(forecast=points, model_version="bench")))
+
+def _body(media_type: str, forecast: pd.DataFrame) -> bytes:
+    if media_type == COLUMNAR_JSON:
+        return forecast_response(forecast, media_type, "bench").body
+    # Drain the streaming generators directly; StreamingResponse only wraps them
+    output = to_output_frame(forecast)
+    if media_type == NDJSON:
+        return "".join(forecast_format._ndjson_chunks(output)).encode()
+    return b"".join(forecast_format._arrow_chunks(output, "bench"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    forecast = _forecast_frame(args.days)
+    cases = {"json (iterrows)": lambda: _iterrows_json(forecast).encode()}
+    for media_type in (COLUMNAR_JSON, NDJSON, ARROW_STREAM):
+        if media_type == ARROW_STREAM and forecast_format.pa is None:
+            continue
+        cases[media_type] = lambda media_type=media_type: _body(media_type, forecast)
+
+    baseline = None
+    print(f"{'format':<42} {'us/call':>10} {'bytes':>8} {'speedup':>8}")
+    for name, fn in cases.items():
+        size = len(fn())
+        elapsed = timeit.timeit(fn, number=args.repeat) / args.repeat * 1e6
+        baseline = baseline or elapsed
+        print(f"{name:<42} {elapsed:>10.1f} {size:>8} {baseline / elapsed:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
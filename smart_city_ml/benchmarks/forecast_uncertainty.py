@@ -0,0 +1,63 @@
+"""
+Benchmark: forecast latency and interval accuracy of each uncertainty mode.
+
+For every horizon the forecast is computed the way the forecast cache does it
+(predict_horizon, no caching) with each mode, and its bounds are compared with full
+sampling. Accuracy is the mean absolute difference of lower and upper bounds from the
+full-sampling bounds, as a share of the full interval's mean half-width; the
+"full (rerun)" row is full sampling against itself with another random seed, the
+noise floor of the reference.
+
+Run from smart_city_ml/:
+    python -m benchmarks.forecast_uncertainty [--models-dir models] [--horizons 30 90 365] [--repeat 5]
+"""
+import argparse
+import logging
+import os
+import time
+
+import joblib
+import numpy as np
+
+from services.forecast_cache import predict_horizon
+from services.forecast_uncertainty import UNCERTAINTY_MODES
+
+def _bound_error(forecast, reference) -> float:
+    half_width = ((reference["yhat_upper"] - reference["yhat_lower"]) / 2).mean()
+    errors = [(forecast[c] - reference[c]).abs().mean() for c in ("yhat_lower", "yhat_upper")]
+    return 100 * float(np.mean(errors)) / half_width
+
+def _latency_ms(model, days: int, mode: str, repeat: int) -> float:
+    predict_horizon(model, days, mode)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        predict_horizon(model, days, mode)
+    return (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--models", nargs="+", default=["aqi.pkl", "water.pkl"])
+    parser.add_argument("--horizons", type=int, nargs="+", default=[30, 90, 365])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger("prophet").setLevel(logging.ERROR)
+
+    for filename in args.models:
+        model = joblib.load(os.path.join(args.models_dir, filename))
+        print(f"\n{filename} ({model.uncertainty_samples} samples for full)")
+        print(f"{'mode':<14} " + " ".join(f"{f'{d}d ms':>9} {f'{d}d err%':>9}" for d in args.horizons))
+        np.random.seed(0)
+        references = {days: predict_horizon(model, days) for days in args.horizons}
+        for mode in ("full (rerun)",) + UNCERTAINTY_MODES[1:]:
+            cells = []
+            for days in args.horizons:
+                uncertainty = "full" if mode == "full (rerun)" else mode
+                np.random.seed(1)
+                forecast = predict_horizon(model, days, uncertainty)
+                error = _bound_error(forecast, references[days]) if mode != "none" else float("nan")
+                cells.append(f"{_latency_ms(model, days, uncertainty, args.repeat):>9.1f} {error:>9.1f}")
+            print(f"{mode:<14} " + " ".join(cells))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Load test: drive the five prediction pipelines concurrently and report throughput, tail latency and peak RSS.
+
+Run from smart_city_ml/:
+    python -m benchmarks.load_test [--server inprocess|uvicorn] [--scenario real|mock|both]
+                                   [--concurrency 16] [--duration 20] [--mix uniform]
+                                   [--output results.json] [--baseline benchmarks/baseline.json]
+                                   [--save-baseline]
+
+The "real" scenario serves the artifacts in --models-dir, "mock" an empty directory so
+every route takes its mock fallback. Results are printed (or written to --output) as JSON;
+with --baseline each run is compared to the stored run of the same configuration and the
+exit status is 1 if throughput, p95 latency or peak RSS regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+PIPELINES = ("aqi", "water", "health", "forest", "traffic")
+# Anything a mix can weight: the five pipelines plus /predict/snapshot, which calls all of them
+ENDPOINTS = PIPELINES + ("snapshot",)
+
+# Relative request weights per pipeline
+MIXES = {
+    "uniform": {name: 1 for name in PIPELINES},
+    "tabular": {"health": 1, "forest": 1, "traffic": 1},
+    "forecast": {"aqi": 1, "water": 1},
+    "dashboard": {"aqi": 1, "water": 1, "health": 2, "forest": 2, "traffic": 2},
+    "snapshot": {"snapshot": 1},
+}
+
+# p95 changes below this many milliseconds are treated as noise when comparing to a baseline
+P95_SLACK_MS = 1.0
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """A preset name from MIXES or explicit weights such as `aqi=1,health=3`."""
+    if spec in MIXES:
+        return dict(MIXES[spec])
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown pipeline '{name}' in mix, expected one of {ENDPOINTS}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def _payload(pipeline: str, rng: random.Random, days: int) -> dict:
+    """A valid request body with randomized inputs, so response caches see realistic key spread."""
+    if pipeline == "snapshot":
+        return {name: _payload(name, rng, days) for name in PIPELINES}
+    if pipeline in ("aqi", "water"):
+        return {"days": days}
+    if pipeline == "health":
+        return {
+            "aqi": rng.uniform(20, 300), "temperature": rng.uniform(5, 45), "humidity": rng.uniform(10, 95),
+            "population_density": rng.uniform(200, 20000), "water_quality_index": rng.uniform(20, 100),
+        }
+    if pipeline == "forest":
+        return {"rainfall": rng.uniform(0, 20), "urban_expansion_rate": rng.uniform(0, 5),
+                "previous_forest_area": rng.uniform(50000, 150000)}
+    return {"time_of_day": rng.randrange(24), "day_of_week": rng.randrange(7),
+            "vehicle_count": rng.randrange(50, 3000), "weather": rng.randrange(5)}
+
+
+# ── SERVERS ────────────────────────────────────────────────────
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 180.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass  # uvicorn is still starting
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"Service was not ready within {timeout:.0f}s")
+
+@asynccontextmanager
+async def inprocess_server(models_dir: str, concurrency: int):
+    """The FastAPI app called through httpx's ASGI transport, in this process."""
+    import main
+    from services.inference_executor import executor
+    from services.model_loader import load_models
+
+    load_models(models_dir)
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+            await _wait_ready(client)
+            yield client, None
+    finally:
+        # Its semaphores belong to this event loop; the next scenario runs on a new one
+        executor.shutdown()
+
+@asynccontextmanager
+async def uvicorn_server(models_dir: str, concurrency: int, port: int = 8765, workers: int = 1):
+    """`uvicorn main:app` in a subprocess, driven over HTTP."""
+    env = dict(os.environ, ML_MODELS_DIR=models_dir)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60.0) as client:
+            await _wait_ready(client)
+            yield client, process.pid
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+SERVERS = {"inprocess": inprocess_server, "uvicorn": uvicorn_server}
+
+
+# ── MEASUREMENT ────────────────────────────────────────────────
+def _process_tree(pid: int) -> List[int]:
+    pids, frontier = [], [pid]
+    while frontier:
+        current = frontier.pop()
+        pids.append(current)
+        try:
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                frontier.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+def _peak_rss_mb(pid: Optional[int]) -> Optional[float]:
+    """
+    Peak resident set size. For a server subprocess this is the sum of VmHWM over the
+    process and its workers (Linux only); in-process it is this process's ru_maxrss,
+    which includes the load generator (each in-process scenario runs in its own child
+    process, see run_isolated, so it is that scenario's peak alone).
+    """
+    if pid is None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    total_kb = 0
+    for child in _process_tree(pid):
+        try:
+            with open(f"/proc/{child}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return round(total_kb / 1024, 1) if total_kb else None
+
+async def drive(client: httpx.AsyncClient, mix: Dict[str, float], concurrency: int, duration: float,
+                warmup: float, days: int, seed: int) -> Tuple[Dict[str, List[Tuple[float, int]]], float]:
+    """
+    Run `concurrency` closed-loop clients for `warmup + duration` seconds.
+    Returns (latency seconds, status) samples per pipeline from the measured window, and its length.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples: Dict[str, List[Tuple[float, int]]] = {name: [] for name in names}
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def _client(index: int):
+        rng = random.Random(seed + index)
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            pipeline = rng.choices(names, weights)[0]
+            body = _payload(pipeline, rng, days)
+            sent = time.perf_counter()
+            try:
+                status = (await client.post(f"/predict/{pipeline}", json=body)).status_code
+            except httpx.HTTPError:
+                status = 0
+            done = time.perf_counter()
+            if sent >= measure_from and done <= stop_at:
+                samples[pipeline].append((done - sent, status))
+
+    await asyncio.gather(*(_client(i) for i in range(concurrency)))
+    return samples, duration
+
+def summarize(samples: List[Tuple[float, int]], window: float) -> dict:
+    if not samples:
+        return {"requests": 0, "rps": 0.0, "errors": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    latencies = np.array([latency for latency, _ in samples]) * 1000.0
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    statuses: Dict[str, int] = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / window, 2),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "statuses": statuses,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(latencies.mean()), 3),
+    }
+
+async def run_scenario(scenario: str, models_dir: str, args) -> dict:
+    mix = parse_mix(args.mix)
+    async with SERVERS[args.server](models_dir, args.concurrency) as (client, pid):
+        samples, window = await drive(client, mix, args.concurrency, args.duration, args.warmup, args.days, args.seed)
+        peak_rss_mb = _peak_rss_mb(pid)
+
+    every = [sample for pipeline_samples in samples.values() for sample in pipeline_samples]
+    return {
+        "scenario": scenario,
+        "server": args.server,
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "forecast_days": args.days,
+        "duration_s": window,
+        "peak_rss_mb": peak_rss_mb,
+        "total": summarize(every, window),
+        "endpoints": {f"/predict/{name}": summarize(s, window) for name, s in samples.items()},
+    }
+
+def _quiet_logs():
+    logging.getLogger("smart_city_ml").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+def _run_in_child(scenario: str, models_dir: str, args) -> dict:
+    _quiet_logs()
+    return asyncio.run(run_scenario(scenario, models_dir, args))
+
+def run_isolated(scenario: str, models_dir: str, args) -> dict:
+    """
+    run_scenario in a fresh interpreter. ru_maxrss never goes down, so in one process
+    the mock scenario would report the peak the real one reached before it.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_run_in_child, scenario, models_dir, args).result()
+
+def run_key(run: dict, mix_name: str) -> str:
+    """Identifies comparable runs in a baseline file."""
+    return f"{run['server']}/{run['scenario']}/{mix_name}/c{run['concurrency']}/d{run['forecast_days']}"
+
+
+# ── BASELINE ───────────────────────────────────────────────────
+def compare(run: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Human-readable regressions of `run` against `baseline` beyond `tolerance` (a fraction)."""
+    regressions = []
+    for endpoint, base in [("total", baseline["total"])] + list(baseline["endpoints"].items()):
+        current = run["total"] if endpoint == "total" else run["endpoints"].get(endpoint)
+        if not current or not base["requests"]:
+            continue
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{endpoint}: throughput {current['rps']} rps < baseline {base['rps']} rps")
+        if current["p95_ms"] is not None and base["p95_ms"] is not None:
+            limit = max(base["p95_ms"] * (1 + tolerance), base["p95_ms"] + P95_SLACK_MS)
+            if current["p95_ms"] > limit:
+                regressions.append(f"{endpoint}: p95 {current['p95_ms']} ms > baseline {base['p95_ms']} ms")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{endpoint}: {current['errors']} errors, baseline had {base['errors']}")
+    if run["peak_rss_mb"] and baseline.get("peak_rss_mb"):
+        if run["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"peak RSS {run['peak_rss_mb']} MB > baseline {baseline['peak_rss_mb']} MB")
+    return regressions
+
+def _load_json(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"runs": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server", choices=sorted(SERVERS), default="inprocess")
+    parser.add_argument("--scenario", choices=("real", "mock", "both"), default="both")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--mix", default="uniform", help=f"one of {sorted(MIXES)} or weights like aqi=1,health=3")
+    parser.add_argument("--days", type=int, default=30, help="forecast horizon of AQI/Water requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed fractional regression")
+    parser.add_argument("--save-baseline", action="store_true", help="store these runs in --baseline")
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    _quiet_logs()
+    scenarios = ("real", "mock") if args.scenario == "both" else (args.scenario,)
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "runs": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="mock-models-") as mock_dir:
+        for scenario in scenarios:
+            models_dir = os.path.abspath(args.models_dir if scenario == "real" else mock_dir)
+            if args.server == "inprocess":
+                run = run_isolated(scenario, models_dir, args)
+            else:
+                run = asyncio.run(run_scenario(scenario, models_dir, args))
+            report["runs"][run_key(run, args.mix)] = run
+            print(f"{run_key(run, args.mix)}: {run['total']['rps']} rps, p95 {run['total']['p95_ms']} ms, "
+                  f"peak RSS {run['peak_rss_mb']} MB", file=sys.stderr)
+
+    failed = False
+    if args.baseline:
+        baseline = _load_json(args.baseline)
+        report["comparison"] = {}
+        for key, run in report["runs"].items():
+            base = baseline["runs"].get(key)
+            regressions = compare(run, base, args.tolerance) if base else []
+            report["comparison"][key] = {"baseline_found": base is not None, "regressions": regressions}
+            failed = failed or bool(regressions)
+        if args.save_baseline:
+            baseline["runs"].update(report["runs"])
+            baseline["host"] = report["host"]
+            with open(args.baseline, "w") as f:
+                json.dump(baseline, f, indent=2)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(1 if failed and not args.save_baseline else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: refitting a Prophet model after a week of new observations, cold versus warm-started.
+
+For each history length a model is fitted on the history, then refit on history + `--new-days`:
+  cold          a fresh fit on everything, as train_real_models.py does
+  warm          the same data, started at the previous fit's parameters (services/prophet_refit.py)
+  warm window   warm-started on only the latest ML_REFIT_WINDOW_DAYS stored days (the service default)
+
+Run from smart_city_ml/:
+    python -m benchmarks.prophet_refit [--histories 1000 4000 16000] [--new-days 7] [--window 1095]
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+import config
+from services.prophet_refit import refit
+
+def _series(days: int, seed: int = 0) -> pd.DataFrame:
+    """Daily AQI-like series: slow trend, yearly and weekly seasonality, noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    y = 120 + 0.005 * t + 25 * np.sin(2 * np.pi * t / 365.25) + 6 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 8, days)
+    return pd.DataFrame({"ds": pd.date_range("1970-01-01", periods=days, freq="D"), "y": y})
+
+def _timed(fn):
+    started = time.perf_counter()
+    model = fn()
+    return time.perf_counter() - started, model
+
+def _forecast_gap(model: Prophet, reference: Prophet, days: int = 30) -> float:
+    """Mean absolute difference of the next `days` of yhat against the cold refit."""
+    frames = [m.predict(m.make_future_dataframe(periods=days, include_history=False))["yhat"].to_numpy()
+              for m in (model, reference)]
+    return float(np.abs(frames[0] - frames[1]).mean())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--histories", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--new-days", type=int, default=7)
+    parser.add_argument("--window", type=int, default=config.ML_REFIT_WINDOW_DAYS)
+    args = parser.parse_args()
+    logging.getLogger("cmdstanpy").disabled = True
+
+    print(f"{'history':>8} {'cold s':>8} {'warm s':>8} {'window s':>9} {'warm |dyhat|':>13} {'window |dyhat|':>15}")
+    for days in args.histories:
+        series = _series(days + args.new_days)
+        current = Prophet(yearly_seasonality=True, weekly_seasonality=True).fit(series.iloc[:days])
+        cold_s, cold = _timed(lambda: Prophet(yearly_seasonality=True, weekly_seasonality=True).fit(series))
+        warm_s, warm = _timed(lambda: refit(current, series))
+        window_s, windowed = _timed(lambda: refit(current, series.tail(args.window)))
+        print(f"{days:>8} {cold_s:>8.2f} {warm_s:>8.2f} {window_s:>9.2f} "
+              f"{_forecast_gap(warm, cold):>13.2f} {_forecast_gap(windowed, cold):>15.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark: Booster.inplace_predict versus the flattened NumPy TreeEnsemble.
+
+Run from smart_city_ml/ (after train_real_models.py or generate_models.py has
+written the `.trees.npz` exports next to the `.pkl` files):
+    python -m benchmarks.tree_evaluator [--models-dir models] [--repeat 300]
+"""
+import argparse
+import os
+import timeit
+import warnings
+
+import joblib
+import numpy as np
+
+from services.tree_ensemble import TreeEnsemble, TREES_SUFFIX
+
+MODELS = ("health", "forest", "traffic")
+
+def _load_seconds(fn, repeat: int = 5) -> float:
+    return timeit.timeit(fn, number=repeat) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    rng = np.random.default_rng(0)
+    print(f"{'model':<8} {'artifact':>10} {'load ms':>8} {'rows':>5} {'booster us/call':>16} {'numpy us/call':>14} {'ratio':>6}")
+    for name in MODELS:
+        pkl_path = os.path.join(args.models_dir, f"{name}.pkl")
+        trees_path = os.path.join(args.models_dir, name + TREES_SUFFIX)
+        if not (os.path.exists(pkl_path) and os.path.exists(trees_path)):
+            print(f"{name:<8} skipped, {pkl_path} or {trees_path} missing")
+            continue
+
+        booster = joblib.load(pkl_path).get_booster()
+        ensemble = TreeEnsemble.load(trees_path)
+        pkl_ms = _load_seconds(lambda: joblib.load(pkl_path)) * 1e3
+        trees_ms = _load_seconds(lambda: TreeEnsemble.load(trees_path)) * 1e3
+        print(f"{name:<8} {'pkl':>10} {pkl_ms:>8.1f} ({os.path.getsize(pkl_path) // 1024} KB)")
+        print(f"{name:<8} {'trees.npz':>10} {trees_ms:>8.1f} ({os.path.getsize(trees_path) // 1024} KB)")
+
+        for n_rows in (1, 64, 4096):
+            features = (rng.random((n_rows, ensemble.n_features)) * 100).astype(np.float32)
+            expected = booster.inplace_predict(features, validate_features=False)
+            assert np.allclose(ensemble.predict(features).reshape(expected.shape), expected, rtol=1e-4, atol=1e-5)
+
+            repeat = max(1, args.repeat // (1 + n_rows // 64))
+            before = timeit.timeit(lambda: booster.inplace_predict(features, validate_features=False), number=repeat)
+            after = timeit.timeit(lambda: ensemble.predict(features), number=repeat)
+            before_us = before / repeat * 1e6
+            after_us = after / repeat * 1e6
+            print(f"{name:<8} {'':>10} {'':>8} {n_rows:>5} {before_us:>16.1f} {after_us:>14.1f} {before_us / after_us:>5.2f}x")
+
+if __name__ == "__main__":
+    main()
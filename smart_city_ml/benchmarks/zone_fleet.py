@@ -0,0 +1,79 @@
+"""
+Benchmark: zone model cache hit rate, lookup latency and resident size under a Zipf-skewed zone mix.
+
+Builds a throwaway models directory where every zone has its own copy of the city-wide
+health and traffic artifacts, then drives the registry's zone cache directly.
+
+Run from smart_city_ml/:
+    python -m benchmarks.zone_fleet [--models-dir models] [--zones 300] [--budget-mb 64] [--lookups 20000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+from services.model_loader import ModelRegistry, MODEL_FILES
+
+MODELS = ("health_model", "traffic_model")
+
+def _percentile_us(samples, q: float) -> float:
+    return float(np.percentile(samples, q)) * 1e6 if samples else float("nan")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--zones", type=int, default=300)
+    parser.add_argument("--budget-mb", type=float, default=64.0)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--zipf", type=float, default=1.2, help="skew of the zone popularity distribution")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    logging.getLogger("smart_city_ml").setLevel(logging.WARNING)
+    fleet_dir = tempfile.mkdtemp(prefix="zone-fleet-")
+    try:
+        registry = ModelRegistry()
+        registry.models_dir = fleet_dir
+        registry.zones.budget_bytes = int(args.budget_mb * 1024 * 1024)
+        for attr in MODELS:
+            source = os.path.join(args.models_dir, MODEL_FILES[attr])
+            for zone in range(args.zones):
+                zone_dir = registry.zone_dir(f"z{zone:04d}")
+                os.makedirs(zone_dir, exist_ok=True)
+                shutil.copyfile(source, os.path.join(zone_dir, MODEL_FILES[attr]))
+
+        rng = np.random.default_rng(0)
+        zones = np.minimum(rng.zipf(args.zipf, args.lookups), args.zones) - 1
+        models = rng.integers(0, len(MODELS), args.lookups)
+        hits, misses = [], []
+
+        async def _run():
+            for zone, model in zip(zones, models):
+                attr, name = MODELS[model], f"z{zone:04d}"
+                started = time.perf_counter()
+                cached = registry.zones.lookup(attr, name) is not None
+                if not cached:
+                    await registry.checkout_zone(attr, name)
+                (hits if cached else misses).append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        asyncio.run(_run())
+        elapsed = time.perf_counter() - started
+
+        print(f"{args.zones} zones x {len(MODELS)} models, budget {args.budget_mb:g} MB, {args.lookups} lookups (zipf {args.zipf})")
+        print(f"  hit rate       {len(hits) / args.lookups:.1%} ({len(hits)} hits, {len(misses)} loads)")
+        print(f"  hit   p50/p99  {_percentile_us(hits, 50):.1f} / {_percentile_us(hits, 99):.1f} us")
+        print(f"  load  p50/p99  {_percentile_us(misses, 50) / 1e3:.1f} / {_percentile_us(misses, 99) / 1e3:.1f} ms")
+        print(f"  resident       {len(registry.zones.snapshot())} models, {registry.zones.resident_bytes / 1024 / 1024:.1f} MB")
+        print(f"  throughput     {args.lookups / elapsed:.0f} lookups/s")
+    finally:
+        shutil.rmtree(fleet_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
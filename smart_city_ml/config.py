@@ -0,0 +1,156 @@
+"""
+Runtime configuration for the Smart City ML service.
+Every setting can be overridden with an environment variable of the same name.
+"""
+import os
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def _env_quanta(name: str, default: dict) -> dict:
+    """Per-model quantization steps, overridden as `health_model.aqi=10,traffic_model.vehicle_count=50`."""
+    quanta = {model: dict(fields) for model, fields in default.items()}
+    for part in (os.getenv(name) or "").split(","):
+        if part.strip():
+            key, _, step = part.partition("=")
+            model, _, field = key.strip().partition(".")
+            quanta.setdefault(model, {})[field] = float(step)
+    return quanta
+
+# ── INFERENCE EXECUTOR ─────────────────────────────────────────
+# Thread pool for XGBoost models (the booster releases the GIL while predicting)
+ML_INFERENCE_THREADS = _env_int("ML_INFERENCE_THREADS", min(32, (os.cpu_count() or 1) + 4))
+# Process pool for Prophet forecasts; 0 runs them on the thread pool instead
+ML_INFERENCE_PROCESSES = _env_int("ML_INFERENCE_PROCESSES", 2)
+# Seconds a request waits for its inference result before returning 504
+ML_INFERENCE_TIMEOUT = _env_float("ML_INFERENCE_TIMEOUT", 10.0)
+# Requests allowed to wait per model beyond its concurrency limit before returning 503
+ML_INFERENCE_MAX_QUEUE = _env_int("ML_INFERENCE_MAX_QUEUE", 64)
+# Concurrent inference calls allowed per model
+ML_INFERENCE_CONCURRENCY = {
+    "aqi_model": _env_int("ML_CONCURRENCY_AQI", 2),
+    "water_model": _env_int("ML_CONCURRENCY_WATER", 2),
+    "health_model": _env_int("ML_CONCURRENCY_HEALTH", 8),
+    "forest_model": _env_int("ML_CONCURRENCY_FOREST", 8),
+    "traffic_model": _env_int("ML_CONCURRENCY_TRAFFIC", 8),
+    # /simulate/montecarlo runs under its own limit so long simulations never hold the models' slots
+    "montecarlo": _env_int("ML_CONCURRENCY_MONTECARLO", 1),
+}
+# Per-workload overrides of ML_INFERENCE_TIMEOUT
+ML_INFERENCE_TIMEOUTS = {
+    "montecarlo": _env_float("ML_MONTECARLO_TIMEOUT", 120.0),
+}
+
+# ── MICRO-BATCHING ─────────────────────────────────────────────
+# Coalesce concurrent single-row XGBoost requests into one predict call
+ML_MICROBATCH_ENABLED = _env_bool("ML_MICROBATCH_ENABLED", True)
+# Longest a request waits for others to join its batch
+ML_MICROBATCH_WINDOW_MS = _env_float("ML_MICROBATCH_WINDOW_MS", 2.0)
+# A batch is flushed immediately once it reaches this many rows
+ML_MICROBATCH_MAX_SIZE = _env_int("ML_MICROBATCH_MAX_SIZE", 64)
+
+# ── MODEL LOADING ──────────────────────────────────────────────
+# Directory holding the model artifacts; an empty or missing directory serves the mock fallbacks
+ML_MODELS_DIR = os.getenv("ML_MODELS_DIR", "models")
+# "eager" loads every model in the background at startup, in parallel;
+# "lazy" loads each model on its first request
+ML_MODEL_LOADING = os.getenv("ML_MODEL_LOADING", "eager").strip().lower()
+# Models loaded concurrently in eager mode
+ML_MODEL_LOAD_WORKERS = _env_int("ML_MODEL_LOAD_WORKERS", 5)
+# Memory-map numpy arrays stored in uncompressed joblib artifacts (read-only, shared page cache).
+# Replace mapped artifacts by writing a new file and renaming it over the old one, never in place.
+ML_MODEL_MMAP = _env_bool("ML_MODEL_MMAP", True)
+# Serve XGBoost pipelines from their flattened `<model>.trees.npz` export (see
+# services/tree_ensemble.py) instead of the pickled booster, when one is present
+# and newer than the `.pkl`. Pure NumPy: about as fast as the booster for single
+# rows and smaller to load, but slower than the booster on large batches.
+ML_TREE_EVALUATOR = _env_bool("ML_TREE_EVALUATOR", False)
+
+# ── ZONE MODELS ────────────────────────────────────────────────
+# Requests that name a zone are served by models/zones/<zone>/<model file> when it exists.
+# Zone models load on first use and the least recently used are evicted once their
+# artifacts' total size exceeds this budget (the city-wide models are not counted).
+ML_ZONE_CACHE_MB = _env_float("ML_ZONE_CACHE_MB", 512.0)
+# Seconds a zone without its own artifact keeps being served the city-wide model without
+# checking the disk again; the model watcher also forgets these on every poll.
+ML_ZONE_NEGATIVE_CACHE_TTL = _env_float("ML_ZONE_NEGATIVE_CACHE_TTL", 30.0)
+# Zones remembered as missing (and artifacts remembered as broken) per worker, least recently added dropped first
+ML_ZONE_NEGATIVE_CACHE_SIZE = _env_int("ML_ZONE_NEGATIVE_CACHE_SIZE", 10000)
+
+# ── RESPONSE CACHE ─────────────────────────────────────────────
+# Cache health, forest and traffic responses keyed by model version and quantized inputs.
+# When enabled, continuous inputs are rounded to the nearest multiple of their step below
+# and the model is called with the rounded values, so every request in a bucket gets the
+# same answer; inputs without a step (hour, weekday, weather code) are matched exactly.
+ML_RESPONSE_CACHE_ENABLED = _env_bool("ML_RESPONSE_CACHE_ENABLED", False)
+# Entries kept per model; the least recently used are evicted beyond this
+ML_RESPONSE_CACHE_SIZE = _env_int("ML_RESPONSE_CACHE_SIZE", 10000)
+# Seconds an entry stays valid; 0 keeps entries until evicted or the model version changes
+ML_RESPONSE_CACHE_TTL = _env_float("ML_RESPONSE_CACHE_TTL", 300.0)
+ML_RESPONSE_CACHE_QUANTA = _env_quanta("ML_RESPONSE_CACHE_QUANTA", {
+    "health_model": {"aqi": 5, "temperature": 0.5, "humidity": 2, "population_density": 50, "water_quality_index": 1},
+    "forest_model": {"rainfall": 0.1, "urban_expansion_rate": 0.05, "previous_forest_area": 100},
+    "traffic_model": {"vehicle_count": 10},
+})
+
+# ── FORECAST UNCERTAINTY ───────────────────────────────────────
+# Simulated paths behind uncertainty="reduced" forecast intervals (Prophet's default, "full", uses 1000)
+ML_FORECAST_REDUCED_SAMPLES = _env_int("ML_FORECAST_REDUCED_SAMPLES", 100)
+
+# ── MONTE CARLO ────────────────────────────────────────────────
+# Largest trial count one /simulate/montecarlo request may ask for
+ML_MONTECARLO_MAX_TRIALS = _env_int("ML_MONTECARLO_MAX_TRIALS", 1_000_000)
+# Trials sampled and predicted per chunk, which bounds the feature matrices held at once
+ML_MONTECARLO_CHUNK_ROWS = _env_int("ML_MONTECARLO_CHUNK_ROWS", 65536)
+
+# ── ONLINE REFITS ──────────────────────────────────────────────
+# POST /observations/{aqi,water} refits and overwrites the aqi/water artifacts in the models
+# directory, so the /observations endpoints answer 403 unless this is set AND ML_ADMIN_TOKEN
+# is configured (requests must then carry it in X-Admin-Token).
+ML_INGEST_ENABLED = _env_bool("ML_INGEST_ENABLED", False)
+# Observations posted to /observations/{aqi,water} are appended to one CSV per series here
+ML_SERIES_DIR = os.getenv("ML_SERIES_DIR", "data/series")
+# Seconds after the first new observation before the Prophet refit starts, so bursts share one refit
+ML_REFIT_DELAY = _env_float("ML_REFIT_DELAY", 5.0)
+# Trailing days of the series a refit fits on (warm-started from the serving model's parameters);
+# bounding it keeps refit time flat as the series grows. 0 refits on the full history.
+ML_REFIT_WINDOW_DAYS = _env_int("ML_REFIT_WINDOW_DAYS", 1095)
+
+# ── METRICS ────────────────────────────────────────────────────
+# Record request, stage, model-load and executor metrics and serve them on /metrics
+ML_METRICS_ENABLED = _env_bool("ML_METRICS_ENABLED", True)
+
+# ── HOT RELOAD ─────────────────────────────────────────────────
+# Seconds between checks of models/ for changed artifacts; 0 disables polling
+ML_MODEL_RELOAD_INTERVAL = _env_float("ML_MODEL_RELOAD_INTERVAL", 30.0)
+# If set, admin endpoints require this value in the X-Admin-Token header; /observations also needs ML_INGEST_ENABLED
+ML_ADMIN_TOKEN = os.getenv("ML_ADMIN_TOKEN", "")
+
+# ── PROFILING ──────────────────────────────────────────────────
+# Opt-in cProfile capture of single requests, stored on disk and served by GET /admin/profiles.
+# Ignored unless ML_ADMIN_TOKEN is set; triggering by header and reading profiles both need the token.
+ML_PROFILING_ENABLED = _env_bool("ML_PROFILING_ENABLED", False)
+# Requests carrying this header and the admin token in X-Admin-Token are profiled
+ML_PROFILING_HEADER = os.getenv("ML_PROFILING_HEADER", "X-Profile")
+# Share of all other requests profiled at random, e.g. 0.001; 0 profiles only on the header
+ML_PROFILING_SAMPLE_RATE = _env_float("ML_PROFILING_SAMPLE_RATE", 0.0)
+# Directory of the profile ring buffer; the oldest profiles are deleted beyond ML_PROFILING_MAX_PROFILES
+ML_PROFILING_DIR = os.getenv("ML_PROFILING_DIR", "data/profiles")
+ML_PROFILING_MAX_PROFILES = _env_int("ML_PROFILING_MAX_PROFILES", 100)
+
+# ── PRE-FORK SERVING ───────────────────────────────────────────
+# Workers started by serve_prefork.py; they share the models the parent loaded copy-on-write
+ML_PREFORK_WORKERS = _env_int("ML_PREFORK_WORKERS", os.cpu_count() or 1)
+# Seconds between per-worker memory reports logged by the parent; 0 logs only once after startup
+ML_PREFORK_REPORT_INTERVAL = _env_float("ML_PREFORK_REPORT_INTERVAL", 300.0)
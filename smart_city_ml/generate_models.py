@@ -5,6 +5,8 @@ import joblib
 from prophet import Prophet
 from xgboost import XGBClassifier, XGBRegressor
 
+from services.tree_ensemble import export_tree_ensemble
+
 # Ensure target directory exists
 os.makedirs("models", exist_ok=True)
 
@@ -33,6 +35,7 @@ y_health = np.random.randint(0, 4, 100) # 4 classes
 health_model = XGBClassifier()
 health_model.fit(X_health, y_health)
 joblib.dump(health_model, "models/health.pkl")
+export_tree_ensemble(health_model, "models/health.trees.npz")
 
 print("Training placeholder Forest model (XGBRegressor)...")
 # Features: rainfall, urban_expansion_rate, previous_forest_area
@@ -41,6 +44,7 @@ y_forest = np.random.rand(100) * 10
 forest_model = XGBRegressor()
 forest_model.fit(X_forest, y_forest)
 joblib.dump(forest_model, "models/forest.pkl")
+export_tree_ensemble(forest_model, "models/forest.trees.npz")
 
 print("Training placeholder Traffic model (XGBClassifier)...")
 # Features: time_of_day, day_of_week, vehicle_count, weather
@@ -49,5 +53,6 @@ y_traffic = np.random.randint(0, 4, 100)
 traffic_model = XGBClassifier()
 traffic_model.fit(X_traffic, y_traffic)
 joblib.dump(traffic_model, "models/traffic.pkl")
+export_tree_ensemble(traffic_model, "models/traffic.trees.npz")
 
 print("Done generating 5 placeholder .pkl models in models/ folder.")
@@ -1,15 +1,22 @@
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("smart_city_ml")
 
 # Import services and routers
-from services.model_loader import load_models
-from routers import aqi, water, health, forest, traffic
+import config
+from services.model_loader import load_models, registry
+from services.inference_executor import executor, InferenceUnavailable
+from services.micro_batcher import shutdown_batchers
+from services.metrics import MetricsMiddleware
+from services.profiler import ProfilingMiddleware, profiling_enabled
+from services.prophet_refit import refits
+from routers import aqi, water, health, forest, traffic, snapshot, simulation, observations, status, admin, metrics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -18,10 +25,21 @@ async def lifespan(app: FastAPI):
     and after the server stops.
     """
     logger.info("Initializing Smart City ML Backend...")
-    # Attempt to load all 5 models at startup
-    load_models()
+    # Load all 5 models (in the background, or lazily on first use);
+    # pre-forked workers already share the parent's loaded models
+    if not registry.preloaded:
+        load_models()
+    # Hot-reload retrained artifacts dropped into models/
+    registry.watch()
+    # Recompute the cached Prophet forecasts at each day boundary, off the request path
+    registry.forecasts.start_rollover()
     yield
     logger.info("Shutting down Smart City ML Backend...")
+    registry.stop_watching()
+    registry.forecasts.stop_rollover()
+    refits.stop()
+    await shutdown_batchers()
+    executor.shutdown()
 
 app = FastAPI(
     title="Smart City ML Prediction API",
@@ -39,12 +57,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-endpoint request latency for /metrics
+if config.ML_METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Opt-in per-request profiles, stored on disk and served by GET /admin/profiles
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+elif config.ML_PROFILING_ENABLED:
+    logger.warning("ML_PROFILING_ENABLED is ignored: request profiling requires ML_ADMIN_TOKEN to be set")
+
+@app.exception_handler(InferenceUnavailable)
+async def inference_unavailable_handler(request: Request, exc: InferenceUnavailable):
+    """Saturated (503) or timed-out (504) inference; clients should back off and retry."""
+    logger.warning(f"Inference unavailable for {exc.model_name}: {exc.detail}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": "1"}
+    )
+
 # Register routers
 app.include_router(aqi.router)
 app.include_router(water.router)
 app.include_router(health.router)
 app.include_router(forest.router)
 app.include_router(traffic.router)
+app.include_router(snapshot.router)
+app.include_router(simulation.router)
+app.include_router(observations.router)
+app.include_router(status.router)
+app.include_router(admin.router)
+if config.ML_METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
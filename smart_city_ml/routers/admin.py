@@ -0,0 +1,118 @@
+import asyncio
+import os
+import re
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+import config
+from schemas.admin import (
+    ReloadResponse, ZoneCacheResponse, ZoneModelInfo, ResponseCacheResponse, ResponseCacheStats, MemoryResponse, ProcessMemory,
+    ProfileInfo, ProfileListResponse,
+)
+from services.model_loader import get_registry, ModelRegistry, MODEL_FILES
+from services.response_cache import get_response_caches
+from services.process_memory import memory_usage, forked_children
+from services.profiler import get_profile_store, profiling_enabled, ProfileStore, PROFILE_ID_PATTERN
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Guard admin endpoints when ML_ADMIN_TOKEN is configured."""
+    if config.ML_ADMIN_TOKEN and x_admin_token != config.ML_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
+
+def require_configured_token():
+    """Profiles are only served with ML_ADMIN_TOKEN set (and sent), unlike the rest of /admin."""
+    if not config.ML_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Profiles are only available with ML_ADMIN_TOKEN configured")
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+
+@router.post("/reload", response_model=ReloadResponse)
+async def reload_models(
+    model: Optional[str] = Query(None, description="Model to reload, e.g. aqi_model; all models if omitted"),
+    force: bool = Query(False, description="Reload even if the artifact on disk is unchanged"),
+    registry: ModelRegistry = Depends(get_registry)
+):
+    """
+    Hot-reload model artifacts from the models directory.
+    New versions are loaded and warmed off the event loop while the current ones keep serving.
+    """
+    if model is not None and model not in MODEL_FILES:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{model}'")
+
+    reloaded = []
+    for attr in [model] if model else list(MODEL_FILES):
+        if await asyncio.to_thread(registry.reload, attr, force):
+            reloaded.append(attr)
+
+    return ReloadResponse(
+        reloaded=reloaded,
+        versions={attr: s.version for attr, s in registry.status.items()}
+    )
+
+@router.get("/zones", response_model=ZoneCacheResponse)
+async def zone_models(registry: ModelRegistry = Depends(get_registry)):
+    """List the zone models resident in the zone cache, least recently used first."""
+    return ZoneCacheResponse(
+        budget_bytes=registry.zones.budget_bytes,
+        resident_bytes=registry.zones.resident_bytes,
+        models=[ZoneModelInfo(**entry) for entry in registry.zones.snapshot()]
+    )
+
+@router.get("/response-cache", response_model=ResponseCacheResponse)
+async def response_cache_stats():
+    """Size, hit rate and quantization of each model's response cache (see ML_RESPONSE_CACHE_ENABLED)."""
+    return ResponseCacheResponse(
+        enabled=config.ML_RESPONSE_CACHE_ENABLED,
+        models={name: ResponseCacheStats(**cache.stats()) for name, cache in get_response_caches().items()}
+    )
+
+@router.delete("/response-cache", response_model=ResponseCacheResponse)
+async def clear_response_cache():
+    """Drop every cached response; hit and miss counts are kept."""
+    for cache in get_response_caches().values():
+        cache.clear()
+    return await response_cache_stats()
+
+@router.get("/memory", response_model=MemoryResponse)
+async def memory(registry: ModelRegistry = Depends(get_registry)):
+    """
+    RSS split into shared and private bytes for this worker or, under serve_prefork.py,
+    for the parent and every worker. Needs Linux /proc; empty elsewhere.
+    """
+    if registry.preloaded:
+        parent = memory_usage(os.getppid())
+        pids = forked_children(os.getppid()) or [os.getpid()]
+    else:
+        parent, pids = None, [os.getpid()]
+    workers = [usage for usage in map(memory_usage, pids) if usage is not None]
+    return MemoryResponse(
+        mode="prefork" if registry.preloaded else "single",
+        pid=os.getpid(),
+        parent=ProcessMemory(**parent) if parent else None,
+        workers=[ProcessMemory(**usage) for usage in workers]
+    )
+
+@router.get("/profiles", response_model=ProfileListResponse, dependencies=[Depends(require_configured_token)])
+async def list_profiles(store: ProfileStore = Depends(get_profile_store)):
+    """Request profiles in the on-disk ring buffer, newest first (see ML_PROFILING_ENABLED)."""
+    profiles = await asyncio.to_thread(store.list)
+    return ProfileListResponse(
+        enabled=profiling_enabled(),
+        max_profiles=store.max_profiles,
+        profiles=[ProfileInfo(**profile) for profile in profiles]
+    )
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse, dependencies=[Depends(require_configured_token)])
+async def get_profile(
+    profile_id: str,
+    format: str = Query("text", pattern="^(text|pstats)$", description="text report, or the raw pstats file for snakeviz/pstats"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+    limit: int = Query(40, ge=1, le=1000, description="Functions listed in the text report"),
+    store: ProfileStore = Depends(get_profile_store)
+):
+    """One stored profile, as a pstats text report sorted by `sort` or as the raw pstats file."""
+    if not re.match(PROFILE_ID_PATTERN, profile_id) or not os.path.exists(store.path(profile_id)):
+        raise HTTPException(status_code=404, detail=f"Unknown profile '{profile_id}'")
+    if format == "pstats":
+        return FileResponse(store.path(profile_id), media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    return await asyncio.to_thread(store.report, profile_id, sort, limit)
@@ -1,52 +1,64 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
 from datetime import datetime, timedelta
+from typing import Optional
 import pandas as pd
 from schemas.prediction import AQIPredictionRequest, AQIPredictionResponse, AQIForecastPoint
-from services.model_loader import get_registry, ModelRegistry
+from services.model_loader import get_registry, ModelRegistry, MOCK_MODEL_VERSION
+from services.inference_executor import get_executor, InferenceExecutor, InferenceUnavailable
+from services.metrics import stage_timer, MOCK_FALLBACKS
+from services.forecast_format import FORECAST_RESPONSES, JSON, negotiate, forecast_response, to_output_frame
 
 router = APIRouter(prefix="/predict", tags=["AQI Pipeline"])
 
-@router.post("/aqi", response_model=AQIPredictionResponse)
-async def predict_aqi(request: AQIPredictionRequest, registry: ModelRegistry = Depends(get_registry)):
+def _mock_forecast(days: int) -> pd.DataFrame:
+    """Placeholder forecast in Prophet's output columns, used until aqi.pkl is added."""
+    tomorrow = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    base = 150.0 + pd.Series(range(days), dtype="float64") * 2.5
+    return pd.DataFrame({
+        "ds": pd.date_range(tomorrow, periods=days, freq="D"),
+        "yhat": base,
+        "yhat_lower": base - 15.0,
+        "yhat_upper": base + 15.0,
+    })
+
+@router.post("/aqi", response_model=AQIPredictionResponse, responses=FORECAST_RESPONSES)
+async def predict_aqi(request: AQIPredictionRequest, registry: ModelRegistry = Depends(get_registry),
+                      executor: InferenceExecutor = Depends(get_executor),
+                      format: Optional[str] = Query(None, description="json, columnar, ndjson or arrow; overrides Accept"),
+                      accept: Optional[str] = Header(None)):
     """
     Generate AQI forecast using Prophet time series model.
+    The body format is negotiated from `format` or the Accept header.
     """
-    model = registry.aqi_model
-    
-    # If the model `.pkl` hasn't been added yet, return mock data
-    if model is None:
-        today = datetime.now()
-        forecast = []
-        for d in range(request.days):
-            date_str = (today + timedelta(days=d+1)).strftime("%Y-%m-%d")
-            base = 150.0 + (d * 2.5)
-            forecast.append(AQIForecastPoint(
-                date=date_str,
-                prediction=round(base, 2),
-                lower_bound=round(base - 15.0, 2),
-                upper_bound=round(base + 15.0, 2)
-            ))
-        return AQIPredictionResponse(forecast=forecast)
+    media_type = negotiate(accept, format)
+    model, model_version = await registry.checkout_zone("aqi_model", request.zone)
 
     try:
-        # Prophet prediction logic
-        future = model.make_future_dataframe(periods=request.days)
-        forecast_df = model.predict(future)
-        
-        # Get only the forecasted part
-        forecast_sliced = forecast_df.tail(request.days)
-        
-        forecast_points = []
-        for _, row in forecast_sliced.iterrows():
-            forecast_points.append(
-                AQIForecastPoint(
-                    date=row['ds'].strftime("%Y-%m-%d"),
-                    prediction=round(row['yhat'], 2),
-                    lower_bound=round(row['yhat_lower'], 2),
-                    upper_bound=round(row['yhat_upper'], 2)
+        # If the model `.pkl` hasn't been added yet, return mock data
+        if model is None:
+            MOCK_FALLBACKS.labels("aqi_model").inc()
+            forecast_sliced, model_version = _mock_forecast(request.days), MOCK_MODEL_VERSION
+        else:
+            # Served from the registry's precomputed full-horizon forecast
+            with stage_timer("/predict/aqi", "inference"):
+                forecast_sliced = await executor.run("aqi_model", registry.forecasts.get, "aqi_model", model,
+                                                     request.days, request.uncertainty)
+
+        with stage_timer("/predict/aqi", "encode"):
+            if media_type != JSON:
+                return forecast_response(forecast_sliced, media_type, model_version)
+
+            output = to_output_frame(forecast_sliced)
+            forecast_points = [
+                AQIForecastPoint(date=date, prediction=prediction, lower_bound=lower, upper_bound=upper)
+                for date, prediction, lower, upper in zip(
+                    output["date"].tolist(), output["prediction"].tolist(),
+                    output["lower_bound"].tolist(), output["upper_bound"].tolist(),
                 )
-            )
-        return AQIPredictionResponse(forecast=forecast_points)
-        
+            ]
+            return AQIPredictionResponse(forecast=forecast_points, model_version=model_version)
+
+    except InferenceUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AQI forecasting failed: {str(e)}")
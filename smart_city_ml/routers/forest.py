@@ -1,35 +1,88 @@
+from functools import partial
 from fastapi import APIRouter, HTTPException, Depends
-import pandas as pd
-from schemas.prediction import ForestPredictionRequest, ForestPredictionResponse
-from services.model_loader import get_registry, ModelRegistry
+from typing import List
+from schemas.prediction import ForestPredictionRequest, ForestPredictionResponse, ForestBatchPredictionResponse
+from services.model_loader import get_registry, ModelRegistry, MOCK_MODEL_VERSION
+from services.inference_executor import get_executor, InferenceExecutor, InferenceUnavailable
+from services.micro_batcher import register_batcher
+from services.feature_schema import CompiledModel
+from services.metrics import stage_timer, MOCK_FALLBACKS
+from services.zone_models import batch_zone
+from services.response_cache import get_response_cache
 
 router = APIRouter(prefix="/predict", tags=["Forest Pipeline"])
 
+def _mock_forest_loss(request: ForestPredictionRequest) -> float:
+    loss = request.previous_forest_area * (request.urban_expansion_rate / 100.0)
+    return round(loss, 2)
+
+def _predict_forest_losses(model: CompiledModel, requests: List[ForestPredictionRequest],
+                           endpoint: str = "/predict/forest") -> List[float]:
+    """Run one vectorized predict over all requests, preserving input order."""
+    with stage_timer(endpoint, "features"):
+        features = model.schema.matrix(requests)
+    with stage_timer(endpoint, "inference"):
+        predictions = model.predict_matrix(features)
+
+    # Ensure non-negative loss
+    return [round(max(0.0, float(p)), 2) for p in predictions]
+
+# Concurrent single-row requests share one model call
+batcher = register_batcher("forest_model", _predict_forest_losses)
+
 @router.post("/forest", response_model=ForestPredictionResponse)
 async def predict_forest(request: ForestPredictionRequest, registry: ModelRegistry = Depends(get_registry)):
     """
     Predict forest area loss using XGBoost regressor.
     """
-    model = registry.forest_model
+    model, model_version = await registry.checkout_zone("forest_model", request.zone)
     
     if model is None:
-        # Mock logic
-        loss = request.previous_forest_area * (request.urban_expansion_rate / 100.0)
-        return ForestPredictionResponse(predicted_forest_loss=round(loss, 2))
+        MOCK_FALLBACKS.labels("forest_model").inc()
+        return ForestPredictionResponse(predicted_forest_loss=_mock_forest_loss(request), model_version=MOCK_MODEL_VERSION)
 
     try:
-        features = pd.DataFrame([{
-            "rainfall": request.rainfall,
-            "urban_expansion_rate": request.urban_expansion_rate,
-            "previous_forest_area": request.previous_forest_area
-        }])
-        
-        prediction = model.predict(features)[0]
-        
-        # Ensure non-negative loss
-        predicted_loss = max(0.0, float(prediction))
-        
-        return ForestPredictionResponse(predicted_forest_loss=round(predicted_loss, 2))
+        cache = get_response_cache("forest_model")
+        if cache is None:
+            predicted_loss = await batcher.submit(model, request)
+        else:
+            # Near-identical payloads share one cached answer per quantization bucket
+            predicted_loss = (await cache.resolve(model_version, [request], partial(batcher.submit_many, model)))[0]
+        with stage_timer("/predict/forest", "encode"):
+            return ForestPredictionResponse(predicted_forest_loss=predicted_loss, model_version=model_version)
         
+    except InferenceUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Forest loss prediction failed: {str(e)}")
+
+@router.post("/forest/batch", response_model=ForestBatchPredictionResponse, response_model_exclude_none=True)
+async def predict_forest_batch(requests: List[ForestPredictionRequest], registry: ModelRegistry = Depends(get_registry),
+                               executor: InferenceExecutor = Depends(get_executor)):
+    """
+    Predict forest area loss for many inputs with a single regressor call.
+    Predictions are returned in the same order as the inputs.
+    """
+    model, model_version = await registry.checkout_zone("forest_model", batch_zone(requests))
+
+    if model is None:
+        MOCK_FALLBACKS.labels("forest_model").inc()
+        return ForestBatchPredictionResponse(predictions=[
+            ForestPredictionResponse(predicted_forest_loss=_mock_forest_loss(r)) for r in requests
+        ], model_version=MOCK_MODEL_VERSION)
+    if not requests:
+        return ForestBatchPredictionResponse(predictions=[], model_version=model_version)
+
+    try:
+        predict = partial(executor.run, "forest_model", _predict_forest_losses, model, endpoint="/predict/forest/batch")
+        cache = get_response_cache("forest_model")
+        losses = await (predict(requests) if cache is None else cache.resolve(model_version, requests, predict))
+        with stage_timer("/predict/forest/batch", "encode"):
+            return ForestBatchPredictionResponse(predictions=[
+                ForestPredictionResponse(predicted_forest_loss=loss) for loss in losses
+            ], model_version=model_version)
+
+    except InferenceUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forest loss batch prediction failed: {str(e)}")
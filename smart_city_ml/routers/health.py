@@ -1,44 +1,96 @@
+from functools import partial
 from fastapi import APIRouter, HTTPException, Depends
-import pandas as pd
-from schemas.prediction import HealthPredictionRequest, HealthPredictionResponse
-from services.model_loader import get_registry, ModelRegistry
+from typing import List
+from schemas.prediction import HealthPredictionRequest, HealthPredictionResponse, HealthBatchPredictionResponse
+from services.model_loader import get_registry, ModelRegistry, MOCK_MODEL_VERSION
+from services.inference_executor import get_executor, InferenceExecutor, InferenceUnavailable
+from services.micro_batcher import register_batcher
+from services.feature_schema import CompiledModel
+from services.metrics import stage_timer, MOCK_FALLBACKS
+from services.zone_models import batch_zone
+from services.response_cache import get_response_cache
 
 router = APIRouter(prefix="/predict", tags=["Health Pipeline"])
 
+# Assume model outputs string labels or map from ints
+RISK_MAP = {0: "LOW", 1: "MODERATE", 2: "HIGH", 3: "CRITICAL"}
+
+def _mock_risk_level(request: HealthPredictionRequest) -> str:
+    risk = "LOW"
+    if request.aqi > 150 or request.water_quality_index < 60:
+        risk = "HIGH"
+    elif request.aqi > 100:
+        risk = "MODERATE"
+    return risk
+
+def _predict_risk_levels(model: CompiledModel, requests: List[HealthPredictionRequest],
+                         endpoint: str = "/predict/health") -> List[str]:
+    """Run one vectorized predict over all requests, preserving input order."""
+    with stage_timer(endpoint, "features"):
+        features = model.schema.matrix(requests)
+    with stage_timer(endpoint, "inference"):
+        predictions = model.predict_matrix(features).tolist()
+    return [
+        RISK_MAP.get(p, str(p)) if isinstance(p, (int, float)) else str(p)
+        for p in predictions
+    ]
+
+# Concurrent single-row requests share one model call
+batcher = register_batcher("health_model", _predict_risk_levels)
+
 @router.post("/health", response_model=HealthPredictionResponse)
 async def predict_health(request: HealthPredictionRequest, registry: ModelRegistry = Depends(get_registry)):
     """
     Assess health risk using XGBoost classifier based on environmental conditions.
     """
-    model = registry.health_model
+    model, model_version = await registry.checkout_zone("health_model", request.zone)
     
     if model is None:
-        # Mock logic
-        risk = "LOW"
-        if request.aqi > 150 or request.water_quality_index < 60:
-            risk = "HIGH"
-        elif request.aqi > 100:
-            risk = "MODERATE"
-        return HealthPredictionResponse(risk_level=risk)
+        MOCK_FALLBACKS.labels("health_model").inc()
+        return HealthPredictionResponse(risk_level=_mock_risk_level(request), model_version=MOCK_MODEL_VERSION)
 
     try:
-        # Prepare input features matching the classifier's expected format
-        features = pd.DataFrame([{
-            "aqi": request.aqi,
-            "temperature": request.temperature,
-            "humidity": request.humidity,
-            "population_density": request.population_density,
-            "water_quality_index": request.water_quality_index
-        }])
-        
-        prediction = model.predict(features)[0]
-        
-        # Assume model outputs string labels or map from ints
-        risk_map = {0: "LOW", 1: "MODERATE", 2: "HIGH", 3: "CRITICAL"}
-        
-        risk_level = risk_map.get(prediction, str(prediction)) if isinstance(prediction, (int, float)) else str(prediction)
-        
-        return HealthPredictionResponse(risk_level=risk_level)
+        cache = get_response_cache("health_model")
+        if cache is None:
+            risk_level = await batcher.submit(model, request)
+        else:
+            # Near-identical payloads share one cached answer per quantization bucket
+            risk_level = (await cache.resolve(model_version, [request], partial(batcher.submit_many, model)))[0]
+        with stage_timer("/predict/health", "encode"):
+            return HealthPredictionResponse(risk_level=risk_level, model_version=model_version)
         
+    except InferenceUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Health prediction failed: {str(e)}")
+
+@router.post("/health/batch", response_model=HealthBatchPredictionResponse, response_model_exclude_none=True)
+async def predict_health_batch(requests: List[HealthPredictionRequest], registry: ModelRegistry = Depends(get_registry),
+                               executor: InferenceExecutor = Depends(get_executor)):
+    """
+    Assess health risk for many inputs with a single classifier call.
+    Predictions are returned in the same order as the inputs.
+    """
+    model, model_version = await registry.checkout_zone("health_model", batch_zone(requests))
+
+    if model is None:
+        MOCK_FALLBACKS.labels("health_model").inc()
+        return HealthBatchPredictionResponse(predictions=[
+            HealthPredictionResponse(risk_level=_mock_risk_level(r)) for r in requests
+        ], model_version=MOCK_MODEL_VERSION)
+    if not requests:
+        return HealthBatchPredictionResponse(predictions=[], model_version=model_version)
+
+    try:
+        predict = partial(executor.run, "health_model", _predict_risk_levels, model, endpoint="/predict/health/batch")
+        cache = get_response_cache("health_model")
+        risk_levels = await (predict(requests) if cache is None else cache.resolve(model_version, requests, predict))
+        with stage_timer("/predict/health/batch", "encode"):
+            return HealthBatchPredictionResponse(predictions=[
+                HealthPredictionResponse(risk_level=risk) for risk in risk_levels
+            ], model_version=model_version)
+
+    except InferenceUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Health batch prediction failed: {str(e)}")
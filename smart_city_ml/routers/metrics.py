@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from services.metrics import REGISTRY, CONTENT_TYPE
+
+router = APIRouter(tags=["Status"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus text exposition of request, stage, model-load, mock-fallback and executor metrics.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
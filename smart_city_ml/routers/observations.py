@@ -0,0 +1,57 @@
+import asyncio
+from typing import Literal
+import pandas as pd
+from fastapi import APIRouter, Depends, HTTPException
+import config
+from schemas.observations import ObservationBatch, IngestResponse, SeriesResponse, RefitInfo
+from services.model_loader import get_registry, ModelRegistry
+from services.prophet_refit import get_refits, RefitScheduler, RefitStatus, SERIES_MODELS
+from routers.admin import require_admin_token
+
+def require_ingest_enabled():
+    """Ingested data replaces the served model artifacts, so ingest stays off unless enabled and token-guarded."""
+    if not (config.ML_INGEST_ENABLED and config.ML_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Observation ingest is disabled; it needs ML_INGEST_ENABLED and ML_ADMIN_TOKEN")
+
+router = APIRouter(prefix="/observations", tags=["Observations"],
+                   dependencies=[Depends(require_ingest_enabled), Depends(require_admin_token)])
+
+Series = Literal["aqi", "water"]
+
+def _refit_info(status: RefitStatus) -> RefitInfo:
+    return RefitInfo(state=status.state, finished_at=status.finished_at, seconds=status.seconds,
+                     rows=status.rows, version=status.version, error=status.error)
+
+@router.post("/{series}", response_model=IngestResponse)
+async def ingest_observations(series: Series, batch: ObservationBatch, registry: ModelRegistry = Depends(get_registry),
+                              refits: RefitScheduler = Depends(get_refits)):
+    """
+    Append daily observations to the AQI or water series and refit its city-wide Prophet
+    model in the background. The first post to a series seeds it with the serving model's
+    training history, so refits always see the full record.
+    """
+    observations = pd.DataFrame({
+        "ds": pd.to_datetime([o.ds for o in batch.observations]),
+        "y": [o.y for o in batch.observations],
+    })
+    seed = None
+    if not refits.store.exists(series):
+        model, _ = await registry.checkout_zone(SERIES_MODELS[series], None)
+        seed = model.history if model is not None else None
+
+    appended = await asyncio.to_thread(refits.store.append, series, observations, seed)
+    if batch.refit:
+        refits.schedule(series)
+    return IngestResponse(series=series, appended=appended, refit=_refit_info(refits.status[series]))
+
+@router.get("/{series}", response_model=SeriesResponse)
+async def series_status(series: Series, refits: RefitScheduler = Depends(get_refits)):
+    """Days stored for the series and the outcome of its latest refit."""
+    rows, first_day, last_day = 0, None, None
+    if refits.store.exists(series):
+        stored = await asyncio.to_thread(refits.store.load, series)
+        rows = len(stored)
+        if rows:
+            first_day, last_day = (d.strftime("%Y-%m-%d") for d in stored["ds"].iloc[[0, -1]])
+    return SeriesResponse(series=series, rows=rows, first_day=first_day, last_day=last_day,
+                          refit=_refit_info(refits.status[series]))
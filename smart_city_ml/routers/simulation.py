@@ -0,0 +1,67 @@
+import secrets
+import time
+import numpy as np
+from fastapi import APIRouter, HTTPException, Depends
+from schemas.simulation import MonteCarloRequest, MonteCarloResponse
+from services.model_loader import get_registry, ModelRegistry
+from services.inference_executor import get_executor, InferenceExecutor, InferenceUnavailable
+from services.monte_carlo import simulate, summarize
+from services.metrics import stage_timer
+from routers.health import RISK_MAP
+from routers.traffic import STATUS_MAP
+
+router = APIRouter(prefix="/simulate", tags=["Simulation"])
+
+# Pipeline -> class label names, or None for regressors
+CLASS_LABELS = {
+    "health": RISK_MAP,
+    "forest": None,
+    "traffic": STATUS_MAP,
+}
+
+def _run(model, request: MonteCarloRequest, seed: int) -> dict:
+    """Sampling, prediction and aggregation, all off the event loop."""
+    labels = CLASS_LABELS[request.pipeline]
+    result = simulate(model, request.inputs, request.trials, seed, regression=labels is None)
+    if labels is not None:
+        return {"class_probabilities": {
+            labels.get(label, str(label)): count / request.trials for label, count in sorted(result.items())
+        }}
+    # Same post-processing as /predict/forest: loss is never negative
+    return {"summary": summarize(np.maximum(result, 0.0), request.quantiles, request.histogram_bins)}
+
+@router.post("/montecarlo", response_model=MonteCarloResponse, response_model_exclude_none=True)
+async def simulate_montecarlo(request: MonteCarloRequest, registry: ModelRegistry = Depends(get_registry),
+                              executor: InferenceExecutor = Depends(get_executor)):
+    """
+    Push `trials` sampled scenarios through the health, forest or traffic model.
+    Every input of the pipeline's prediction request needs a distribution; trials are
+    sampled and predicted in chunks, and only aggregate statistics are returned.
+    """
+    attr = f"{request.pipeline}_model"
+    model, model_version = await registry.checkout_zone(attr, request.zone)
+    if model is None:
+        raise HTTPException(status_code=503, detail=f"{attr} is not loaded; simulations need the trained model")
+
+    fields = set(model.schema.fields)
+    missing, unknown = fields - set(request.inputs), set(request.inputs) - fields
+    if missing or unknown:
+        raise HTTPException(status_code=422, detail=(
+            f"inputs for {request.pipeline} must be exactly {sorted(fields)}; "
+            f"missing {sorted(missing)}, unknown {sorted(unknown)}"
+        ))
+
+    seed = request.seed if request.seed is not None else secrets.randbits(32)
+    started = time.perf_counter()
+    try:
+        with stage_timer("/simulate/montecarlo", "inference"):
+            result = await executor.run("montecarlo", _run, model, request, seed)
+    except InferenceUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Monte Carlo simulation failed: {str(e)}")
+
+    return MonteCarloResponse(
+        pipeline=request.pipeline, trials=request.trials, seed=seed, model_version=model_version,
+        seconds=round(time.perf_counter() - started, 4), **result
+    )
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+from fastapi import APIRouter, Depends, HTTPException
+from schemas.prediction import SnapshotRequest, SnapshotResponse
+from services.model_loader import get_registry, ModelRegistry
+from services.inference_executor import get_executor, InferenceExecutor, InferenceUnavailable
+from routers import aqi, water, health, forest, traffic
+
+logger = logging.getLogger("smart_city_ml")
+
+router = APIRouter(prefix="/predict", tags=["City Snapshot"])
+
+# Section of the snapshot -> the pipeline's own endpoint, called with its JSON body format
+PIPELINES = {
+    "aqi": lambda request, registry, executor: aqi.predict_aqi(request, registry, executor, format=None, accept=None),
+    "water": lambda request, registry, executor: water.predict_water(request, registry, executor, format=None, accept=None),
+    "health": lambda request, registry, executor: health.predict_health(request, registry),
+    "forest": lambda request, registry, executor: forest.predict_forest(request, registry),
+    "traffic": lambda request, registry, executor: traffic.predict_traffic(request, registry),
+}
+
+async def _timed(name: str, request, registry: ModelRegistry, executor: InferenceExecutor):
+    """Run one pipeline; returns (response or None, seconds, error or None) and never raises."""
+    started = time.perf_counter()
+    try:
+        result, error = await PIPELINES[name](request, registry, executor), None
+    except (HTTPException, InferenceUnavailable) as e:
+        result, error = None, str(e.detail)
+    except Exception as e:
+        result, error = None, str(e)
+    if error is not None:
+        logger.warning(f"Snapshot pipeline {name} failed: {error}")
+    return result, time.perf_counter() - started, error
+
+@router.post("/snapshot", response_model=SnapshotResponse, response_model_exclude_none=True)
+async def predict_snapshot(request: SnapshotRequest, registry: ModelRegistry = Depends(get_registry),
+                           executor: InferenceExecutor = Depends(get_executor)):
+    """
+    Run every pipeline that has a payload concurrently and return one merged response.
+    Latency is that of the slowest pipeline; a failing pipeline is reported in `errors`
+    while the others still return their results.
+    """
+    started = time.perf_counter()
+    sections = {}
+    for name in PIPELINES:
+        payload = getattr(request, name)
+        if payload is None:
+            continue
+        if request.zone is not None and payload.zone is None:
+            payload = payload.model_copy(update={"zone": request.zone})
+        sections[name] = payload
+
+    outcomes = await asyncio.gather(*[_timed(name, payload, registry, executor) for name, payload in sections.items()])
+
+    results, timings, errors = {}, {}, {}
+    for name, (result, seconds, error) in zip(sections, outcomes):
+        timings[name] = round(seconds, 6)
+        if error is None:
+            results[name] = result
+        else:
+            errors[name] = error
+    timings["total"] = round(time.perf_counter() - started, 6)
+    return SnapshotResponse(**results, timings=timings, errors=errors)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Response
+from schemas.status import ReadinessResponse, ModelReadiness
+from services.model_loader import get_registry, ModelRegistry
+
+router = APIRouter(tags=["Status"])
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def ready(response: Response, registry: ModelRegistry = Depends(get_registry)):
+    """
+    Report per-model load state and load time.
+    Returns 503 while eager loading is still in progress so orchestrators hold back traffic.
+    """
+    is_ready = registry.is_ready()
+    if not is_ready:
+        response.status_code = 503
+    return ReadinessResponse(
+        ready=is_ready,
+        loading_mode="lazy" if registry.lazy else "eager",
+        models={
+            attr: ModelReadiness(state=s.state, version=s.version, load_seconds=s.load_seconds, error=s.error)
+            for attr, s in registry.status.items()
+        }
+    )
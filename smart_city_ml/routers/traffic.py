@@ -1,41 +1,96 @@
+from functools import partial
 from fastapi import APIRouter, HTTPException, Depends
-import pandas as pd
-from schemas.prediction import TrafficPredictionRequest, TrafficPredictionResponse
-from services.model_loader import get_registry, ModelRegistry
+from typing import List
+from schemas.prediction import TrafficPredictionRequest, TrafficPredictionResponse, TrafficBatchPredictionResponse
+from services.model_loader import get_registry, ModelRegistry, MOCK_MODEL_VERSION
+from services.inference_executor import get_executor, InferenceExecutor, InferenceUnavailable
+from services.micro_batcher import register_batcher
+from services.feature_schema import CompiledModel
+from services.metrics import stage_timer, MOCK_FALLBACKS
+from services.zone_models import batch_zone
+from services.response_cache import get_response_cache
 
 router = APIRouter(prefix="/predict", tags=["Traffic Pipeline"])
 
+# Assume status string or ints that map to labels
+STATUS_MAP = {0: "CLEAR", 1: "NORMAL", 2: "CONGESTED", 3: "GRIDLOCK"}
+
+def _mock_traffic_status(request: TrafficPredictionRequest) -> str:
+    status = "NORMAL"
+    if request.vehicle_count > 1000 or request.weather > 2:
+        status = "CONGESTED"
+    elif request.vehicle_count < 200:
+        status = "CLEAR"
+    return status
+
+def _predict_traffic_statuses(model: CompiledModel, requests: List[TrafficPredictionRequest],
+                              endpoint: str = "/predict/traffic") -> List[str]:
+    """Run one vectorized predict over all requests, preserving input order."""
+    with stage_timer(endpoint, "features"):
+        features = model.schema.matrix(requests)
+    with stage_timer(endpoint, "inference"):
+        predictions = model.predict_matrix(features).tolist()
+    return [
+        STATUS_MAP.get(p, str(p)) if isinstance(p, (int, float)) else str(p)
+        for p in predictions
+    ]
+
+# Concurrent single-row requests share one model call
+batcher = register_batcher("traffic_model", _predict_traffic_statuses)
+
 @router.post("/traffic", response_model=TrafficPredictionResponse)
 async def predict_traffic(request: TrafficPredictionRequest, registry: ModelRegistry = Depends(get_registry)):
     """
     Predict traffic congestion status using XGBoost/RandomForest classifier.
     """
-    model = registry.traffic_model
+    model, model_version = await registry.checkout_zone("traffic_model", request.zone)
     
     if model is None:
-        # Mock logic
-        status = "NORMAL"
-        if request.vehicle_count > 1000 or request.weather > 2:
-            status = "CONGESTED"
-        elif request.vehicle_count < 200:
-            status = "CLEAR"
-        return TrafficPredictionResponse(traffic_status=status)
+        MOCK_FALLBACKS.labels("traffic_model").inc()
+        return TrafficPredictionResponse(traffic_status=_mock_traffic_status(request), model_version=MOCK_MODEL_VERSION)
 
     try:
-        features = pd.DataFrame([{
-            "time_of_day": request.time_of_day,
-            "day_of_week": request.day_of_week,
-            "vehicle_count": request.vehicle_count,
-            "weather": request.weather
-        }])
-        
-        prediction = model.predict(features)[0]
-        
-        # Assume status string or ints that map to labels
-        status_map = {0: "CLEAR", 1: "NORMAL", 2: "CONGESTED", 3: "GRIDLOCK"}
-        status_level = status_map.get(prediction, str(prediction)) if isinstance(prediction, (int, float)) else str(prediction)
-        
-        return TrafficPredictionResponse(traffic_status=status_level)
+        cache = get_response_cache("traffic_model")
+        if cache is None:
+            status_level = await batcher.submit(model, request)
+        else:
+            # Near-identical payloads share one cached answer per quantization bucket
+            status_level = (await cache.resolve(model_version, [request], partial(batcher.submit_many, model)))[0]
+        with stage_timer("/predict/traffic", "encode"):
+            return TrafficPredictionResponse(traffic_status=status_level, model_version=model_version)
         
+    except InferenceUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Traffic prediction failed: {str(e)}")
+
+@router.post("/traffic/batch", response_model=TrafficBatchPredictionResponse, response_model_exclude_none=True)
+async def predict_traffic_batch(requests: List[TrafficPredictionRequest], registry: ModelRegistry = Depends(get_registry),
+                                executor: InferenceExecutor = Depends(get_executor)):
+    """
+    Predict traffic congestion status for many inputs with a single classifier call.
+    Predictions are returned in the same order as the inputs.
+    """
+    model, model_version = await registry.checkout_zone("traffic_model", batch_zone(requests))
+
+    if model is None:
+        MOCK_FALLBACKS.labels("traffic_model").inc()
+        return TrafficBatchPredictionResponse(predictions=[
+            TrafficPredictionResponse(traffic_status=_mock_traffic_status(r)) for r in requests
+        ], model_version=MOCK_MODEL_VERSION)
+    if not requests:
+        return TrafficBatchPredictionResponse(predictions=[], model_version=model_version)
+
+    try:
+        predict = partial(executor.run, "traffic_model", _predict_traffic_statuses, model, endpoint="/predict/traffic/batch")
+        cache = get_response_cache("traffic_model")
+        statuses = await (predict(requests) if cache is None else cache.resolve(model_version, requests, predict))
+        with stage_timer("/predict/traffic/batch", "encode"):
+            return TrafficBatchPredictionResponse(predictions=[
+                TrafficPredictionResponse(traffic_status=status) for status in statuses
+            ], model_version=model_version)
+
+    except InferenceUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Traffic batch prediction failed: {str(e)}")
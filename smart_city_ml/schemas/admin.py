@@ -0,0 +1,65 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+# ── MODEL RELOAD ───────────────────────────────────────────────
+class ReloadResponse(BaseModel):
+    reloaded: List[str]
+    versions: Dict[str, Optional[str]]
+
+# ── ZONE CACHE ─────────────────────────────────────────────────
+class ZoneModelInfo(BaseModel):
+    model: str
+    zone: str
+    version: str
+    bytes: int
+    load_seconds: float
+    last_used: float
+
+class ZoneCacheResponse(BaseModel):
+    budget_bytes: int
+    resident_bytes: int
+    models: List[ZoneModelInfo]
+
+# ── RESPONSE CACHE ─────────────────────────────────────────────
+class ResponseCacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    ttl: float
+    hits: int
+    misses: int
+    hit_rate: Optional[float] = None
+    quanta: Dict[str, float]
+
+class ResponseCacheResponse(BaseModel):
+    enabled: bool
+    models: Dict[str, ResponseCacheStats]
+
+# ── MEMORY ─────────────────────────────────────────────────────
+class ProcessMemory(BaseModel):
+    pid: int
+    rss_bytes: int
+    pss_bytes: int
+    shared_bytes: int
+    private_bytes: int
+
+class MemoryResponse(BaseModel):
+    mode: str
+    pid: int
+    parent: Optional[ProcessMemory] = None
+    workers: List[ProcessMemory]
+
+# ── PROFILES ───────────────────────────────────────────────────
+class ProfileInfo(BaseModel):
+    id: str
+    method: str
+    path: str
+    status: int
+    seconds: float
+    trigger: str
+    pid: int
+    created: str
+
+class ProfileListResponse(BaseModel):
+    enabled: bool
+    max_profiles: int
+    profiles: List[ProfileInfo]
@@ -0,0 +1,32 @@
+from datetime import date
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# ── INGESTION ──────────────────────────────────────────────────
+class Observation(BaseModel):
+    ds: date = Field(..., description="Day of the observation")
+    y: float = Field(..., allow_inf_nan=False, description="Daily mean AQI or water quality index")
+
+class ObservationBatch(BaseModel):
+    observations: List[Observation] = Field(..., min_length=1, max_length=10000)
+    refit: bool = Field(True, description="Schedule a background refit of the series' Prophet model")
+
+class RefitInfo(BaseModel):
+    state: str
+    finished_at: Optional[str] = None
+    seconds: Optional[float] = None
+    rows: Optional[int] = Field(None, description="Days the last refit was fitted on")
+    version: Optional[str] = Field(None, description="Model version serving after the last refit")
+    error: Optional[str] = None
+
+class IngestResponse(BaseModel):
+    series: str
+    appended: int = Field(..., description="Rows written, including the model's training history when the series was first created")
+    refit: RefitInfo
+
+class SeriesResponse(BaseModel):
+    series: str
+    rows: int
+    first_day: Optional[str] = None
+    last_day: Optional[str] = None
+    refit: RefitInfo
@@ -1,30 +1,54 @@
-from pydantic import BaseModel, Field
-from typing import List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Literal, Optional
+
+# Zone ids name directories under models/zones/, so they are restricted to a safe alphabet
+ZONE_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
+ZONE_DESCRIPTION = "Zone whose own model serves the request; the city-wide model if omitted or the zone has none"
+
+# Accuracy of each mode against full sampling is documented in services/forecast_uncertainty.py
+UncertaintyMode = Literal["full", "reduced", "analytic", "none"]
+
+UNCERTAINTY_DESCRIPTION = (
+    "How lower_bound/upper_bound are computed: full (Prophet's 1000 simulated paths), reduced "
+    "(fewer paths, noisier bounds), analytic (closed-form normal approximation) or none (point forecast, no bounds)"
+)
+
+class PredictionResponse(BaseModel):
+    """Base for responses that report which model artifact served them."""
+    # `model_version` would otherwise clash with pydantic's protected "model_" namespace
+    model_config = ConfigDict(protected_namespaces=())
+
+    model_version: Optional[str] = Field(None, description="Version of the model artifact that served this response")
 
 # ── AQI ────────────────────────────────────────────────────────
 class AQIPredictionRequest(BaseModel):
     days: int = Field(..., ge=1, le=365, description="Number of days to forecast")
+    zone: Optional[str] = Field(None, pattern=ZONE_ID_PATTERN, description=ZONE_DESCRIPTION)
+    uncertainty: UncertaintyMode = Field("full", description=UNCERTAINTY_DESCRIPTION)
 
 class AQIForecastPoint(BaseModel):
     date: str
     prediction: float
-    lower_bound: float
-    upper_bound: float
+    lower_bound: Optional[float] = None
+    upper_bound: Optional[float] = None
 
-class AQIPredictionResponse(BaseModel):
+class AQIPredictionResponse(PredictionResponse):
     forecast: List[AQIForecastPoint]
 
 # ── WATER ──────────────────────────────────────────────────────
 class WaterPredictionRequest(BaseModel):
     days: int = Field(..., ge=1, le=365, description="Number of days to forecast")
+    zone: Optional[str] = Field(None, pattern=ZONE_ID_PATTERN, description=ZONE_DESCRIPTION)
+    uncertainty: UncertaintyMode = Field("full", description=UNCERTAINTY_DESCRIPTION)
 
 class WaterForecastPoint(BaseModel):
     date: str
     prediction: float
-    lower_bound: float
-    upper_bound: float
+    lower_bound: Optional[float] = None
+    upper_bound: Optional[float] = None
 
-class WaterPredictionResponse(BaseModel):
+class WaterPredictionResponse(PredictionResponse):
     forecast: List[WaterForecastPoint]
 
 # ── HEALTH ─────────────────────────────────────────────────────
@@ -34,25 +58,57 @@ class HealthPredictionRequest(BaseModel):
     humidity: float
     population_density: float
     water_quality_index: float
+    zone: Optional[str] = Field(None, pattern=ZONE_ID_PATTERN, description=ZONE_DESCRIPTION)
 
-class HealthPredictionResponse(BaseModel):
+class HealthPredictionResponse(PredictionResponse):
     risk_level: str
 
+class HealthBatchPredictionResponse(PredictionResponse):
+    predictions: List[HealthPredictionResponse]
+
 # ── FOREST ─────────────────────────────────────────────────────
 class ForestPredictionRequest(BaseModel):
     rainfall: float
     urban_expansion_rate: float
     previous_forest_area: float
+    zone: Optional[str] = Field(None, pattern=ZONE_ID_PATTERN, description=ZONE_DESCRIPTION)
 
-class ForestPredictionResponse(BaseModel):
+class ForestPredictionResponse(PredictionResponse):
     predicted_forest_loss: float
 
+class ForestBatchPredictionResponse(PredictionResponse):
+    predictions: List[ForestPredictionResponse]
+
 # ── TRAFFIC ────────────────────────────────────────────────────
 class TrafficPredictionRequest(BaseModel):
     time_of_day: int = Field(..., description="Hour of the day 0-23")
     day_of_week: int = Field(..., description="0=Monday, 6=Sunday")
     vehicle_count: int
     weather: int = Field(..., description="Categorical weather condition code")
+    zone: Optional[str] = Field(None, pattern=ZONE_ID_PATTERN, description=ZONE_DESCRIPTION)
 
-class TrafficPredictionResponse(BaseModel):
+class TrafficPredictionResponse(PredictionResponse):
     traffic_status: str
+
+class TrafficBatchPredictionResponse(PredictionResponse):
+    predictions: List[TrafficPredictionResponse]
+
+# ── SNAPSHOT ───────────────────────────────────────────────────
+class SnapshotRequest(BaseModel):
+    """One payload per pipeline; pipelines whose payload is omitted are skipped."""
+    zone: Optional[str] = Field(None, pattern=ZONE_ID_PATTERN,
+                                description="Default zone for the payloads that do not name one")
+    aqi: Optional[AQIPredictionRequest] = None
+    water: Optional[WaterPredictionRequest] = None
+    health: Optional[HealthPredictionRequest] = None
+    forest: Optional[ForestPredictionRequest] = None
+    traffic: Optional[TrafficPredictionRequest] = None
+
+class SnapshotResponse(BaseModel):
+    aqi: Optional[AQIPredictionResponse] = None
+    water: Optional[WaterPredictionResponse] = None
+    health: Optional[HealthPredictionResponse] = None
+    forest: Optional[ForestPredictionResponse] = None
+    traffic: Optional[TrafficPredictionResponse] = None
+    timings: Dict[str, float] = Field(..., description="Seconds each requested pipeline took, and the wall time as 'total'")
+    errors: Dict[str, str] = Field({}, description="Pipelines that failed, with the error; their results are omitted")
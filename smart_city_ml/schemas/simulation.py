@@ -0,0 +1,108 @@
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Dict, List, Literal, Optional, Union
+from schemas.prediction import ZONE_ID_PATTERN, ZONE_DESCRIPTION
+import config
+
+# ── INPUT DISTRIBUTIONS ────────────────────────────────────────
+class _Bounded(BaseModel):
+    """Samples are clipped to [min, max] when given, e.g. to keep humidity within 0-100."""
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class ConstantDistribution(_Bounded):
+    kind: Literal["constant"]
+    value: float
+
+class UniformDistribution(_Bounded):
+    kind: Literal["uniform"]
+    low: float
+    high: float
+
+    @model_validator(mode="after")
+    def _check_range(self):
+        if self.high < self.low:
+            raise ValueError("high must be >= low")
+        return self
+
+class NormalDistribution(_Bounded):
+    kind: Literal["normal"]
+    mean: float
+    std: float = Field(..., ge=0)
+
+class LognormalDistribution(_Bounded):
+    """Parameters of the underlying normal distribution, as in numpy."""
+    kind: Literal["lognormal"]
+    mean: float
+    sigma: float = Field(..., ge=0)
+
+class TriangularDistribution(_Bounded):
+    kind: Literal["triangular"]
+    low: float
+    mode: float
+    high: float
+
+    @model_validator(mode="after")
+    def _check_order(self):
+        if not self.low <= self.mode <= self.high or self.low == self.high:
+            raise ValueError("triangular needs low <= mode <= high and low < high")
+        return self
+
+class ChoiceDistribution(_Bounded):
+    """Discrete values, e.g. weather codes, with optional relative weights."""
+    kind: Literal["choice"]
+    values: List[float] = Field(..., min_length=1)
+    weights: Optional[List[float]] = None
+
+    @model_validator(mode="after")
+    def _check_weights(self):
+        if self.weights is not None:
+            if len(self.weights) != len(self.values) or min(self.weights) < 0 or sum(self.weights) <= 0:
+                raise ValueError("weights must be non-negative, not all zero, and one per value")
+        return self
+
+Distribution = Union[
+    ConstantDistribution, UniformDistribution, NormalDistribution,
+    LognormalDistribution, TriangularDistribution, ChoiceDistribution,
+]
+
+# ── MONTE CARLO ────────────────────────────────────────────────
+class MonteCarloRequest(BaseModel):
+    pipeline: Literal["health", "forest", "traffic"]
+    inputs: Dict[str, Distribution] = Field(
+        ..., description="One distribution per field of the pipeline's prediction request, e.g. aqi, temperature"
+    )
+    trials: int = Field(..., ge=1, le=config.ML_MONTECARLO_MAX_TRIALS)
+    seed: Optional[int] = Field(None, ge=0, description="Fixes the sampled trials; random if omitted")
+    quantiles: List[float] = Field([0.05, 0.25, 0.5, 0.75, 0.95], description="Reported for regression outputs")
+    histogram_bins: int = Field(20, ge=1, le=1000)
+    zone: Optional[str] = Field(None, pattern=ZONE_ID_PATTERN, description=ZONE_DESCRIPTION)
+
+    @model_validator(mode="after")
+    def _check_quantiles(self):
+        if any(not 0 <= q <= 1 for q in self.quantiles):
+            raise ValueError("quantiles must lie in [0, 1]")
+        return self
+
+class Histogram(BaseModel):
+    edges: List[float]
+    counts: List[int]
+
+class OutputSummary(BaseModel):
+    mean: float
+    std: float
+    min: float
+    max: float
+    quantiles: Dict[str, float]
+    histogram: Histogram
+
+class MonteCarloResponse(BaseModel):
+    # `model_version` would otherwise clash with pydantic's protected "model_" namespace
+    model_config = ConfigDict(protected_namespaces=())
+
+    pipeline: str
+    trials: int
+    seed: int
+    model_version: Optional[str] = None
+    class_probabilities: Optional[Dict[str, float]] = Field(None, description="Classifier pipelines (health, traffic)")
+    summary: Optional[OutputSummary] = Field(None, description="Regression pipelines (forest)")
+    seconds: float
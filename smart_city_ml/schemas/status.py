@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+# ── READINESS ──────────────────────────────────────────────────
+class ModelReadiness(BaseModel):
+    state: str
+    version: Optional[str] = None
+    load_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    loading_mode: str
+    models: Dict[str, ModelReadiness]
@@ -0,0 +1,156 @@
+"""
+Pre-fork serving: load the models once, then fork uvicorn workers that share them.
+
+Run from smart_city_ml/ (Linux/macOS; fork is not available on Windows):
+    python serve_prefork.py [--workers 4] [--host 0.0.0.0] [--port 8001]
+
+The parent loads and warms every model (including the precomputed Prophet forecasts),
+moves the resulting heap into the garbage collector's permanent generation with
+gc.freeze() so collections in the workers never write to those pages, then binds the
+listening socket and forks the workers. Model memory is therefore shared copy-on-write
+instead of being unpickled once per worker, as with `uvicorn --workers`. Arrays of
+uncompressed joblib artifacts are memory-mapped (ML_MODEL_MMAP) and shared through the
+page cache either way.
+
+The parent restarts workers that die and logs each worker's RSS split into shared and
+private bytes (see also GET /admin/memory). Each worker keeps its own metrics, hot reloads
+and caches: a model a worker hot-reloads becomes private to that worker.
+"""
+import os
+
+# One OpenMP thread per worker: the workers already use every core between them, and
+# libgomp's thread pool does not survive fork() if the parent has started it.
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+import argparse
+import gc
+import logging
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+import config
+import main
+from services.inference_executor import executor
+from services.model_loader import load_models, registry
+from services.process_memory import memory_usage, format_usage
+
+logger = logging.getLogger("smart_city_ml")
+
+# Seconds after startup before the first memory report, so workers have served some traffic
+FIRST_REPORT_DELAY = 30.0
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def _run_worker(sock: socket.socket, host: str, port: int):
+    """Child process: serve the inherited socket until uvicorn exits."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(main.app, host=host, port=port, log_level="info"))
+    server.run(sockets=[sock])
+
+def _fork_worker(sock: socket.socket, host: str, port: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(sock, host, port)
+        except BaseException as e:
+            logger.error(f"Worker {os.getpid()} crashed: {e}")
+            code = 1
+        finally:
+            # Never return into the parent's supervision loop
+            os._exit(code)
+    return pid
+
+def report_memory(pids):
+    parent = memory_usage(os.getpid())
+    if parent is None:
+        logger.info("Per-worker memory report unavailable (no /proc/<pid>/smaps_rollup)")
+        return
+    workers = [usage for usage in (memory_usage(pid) for pid in pids) if usage is not None]
+    logger.info(f"Pre-fork parent {format_usage(parent)}")
+    for usage in workers:
+        logger.info(f"  worker {format_usage(usage)}")
+    total_rss = sum(u["rss_bytes"] for u in workers) / (1024 * 1024)
+    total_pss = sum(u["pss_bytes"] for u in workers) / (1024 * 1024)
+    logger.info(f"  {len(workers)} workers: summed RSS {total_rss:.1f} MB, actual footprint (PSS) {total_pss:.1f} MB")
+
+
+def serve(workers: int, host: str, port: int, report_interval: float = config.ML_PREFORK_REPORT_INTERVAL):
+    # 1. Load and warm everything in the parent, blocking until done
+    started = time.perf_counter()
+    load_models(mode="eager", block=True)
+    registry.preloaded = True
+    # The loads ran the executor's process pool for the Prophet forecasts; workers start their own
+    executor.shutdown(wait=True)
+    logger.info(f"Pre-fork parent loaded models in {time.perf_counter() - started:.2f}s")
+
+    # 2. Keep collections in the workers from touching (and so copying) the parent's objects
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Froze {gc.get_freeze_count()} objects before forking")
+
+    # 3. Fork and supervise
+    sock = _bind(host, port)
+    children = {_fork_worker(sock, host, port) for _ in range(workers)}
+    logger.info(f"Serving on {host}:{port} with {workers} pre-forked workers: {sorted(children)}")
+
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    next_report = time.monotonic() + FIRST_REPORT_DELAY
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if not stopping and time.monotonic() >= next_report:
+                report_memory(children)
+                next_report = time.monotonic() + report_interval if report_interval > 0 else float("inf")
+            time.sleep(0.5)
+            continue
+
+        children.discard(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}; starting a replacement")
+            children.add(_fork_worker(sock, host, port))
+
+    sock.close()
+    logger.info("All pre-forked workers stopped")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=config.ML_PREFORK_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    if not hasattr(os, "fork"):
+        sys.exit("Pre-fork serving needs os.fork(); use `uvicorn main:app --workers N` on this platform")
+    serve(max(1, args.workers), args.host, args.port)
+
+if __name__ == "__main__":
+    main_cli()
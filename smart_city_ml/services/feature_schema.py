@@ -0,0 +1,139 @@
+import logging
+from operator import attrgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from schemas.prediction import HealthPredictionRequest, ForestPredictionRequest, TrafficPredictionRequest
+from services.tree_ensemble import TreeEnsemble
+
+logger = logging.getLogger("smart_city_ml")
+
+
+class FeatureSchema:
+    """
+    Fixed-order mapping from a pydantic request to a float32 feature row.
+
+    Each feature is a request field plus the column names it may have been
+    trained under (see train_real_models.py), so a booster's stored feature
+    names can be checked once when the model is loaded instead of per request.
+    """
+    def __init__(self, request_model, features: Sequence[Tuple[str, Tuple[str, ...]]]):
+        self.request_model = request_model
+        self.fields: List[str] = [field for field, _ in features]
+        self.aliases: Dict[str, Tuple[str, ...]] = {field: (field,) + tuple(names) for field, names in features}
+
+        unknown = set(self.fields) - set(request_model.model_fields)
+        if unknown:
+            raise ValueError(f"{request_model.__name__} has no fields {sorted(unknown)}")
+
+        getter = attrgetter(*self.fields)
+        # attrgetter returns a bare value rather than a tuple for a single field
+        self._getter = getter if len(self.fields) > 1 else (lambda r: (getter(r),))
+
+    @property
+    def n_features(self) -> int:
+        return len(self.fields)
+
+    def matrix(self, requests: Sequence) -> np.ndarray:
+        """Stack requests into an (n, n_features) float32 matrix in schema order."""
+        return np.array([self._getter(r) for r in requests], dtype=np.float32).reshape(len(requests), self.n_features)
+
+    def check(self, feature_names: Optional[Sequence[str]], n_features: int):
+        """Raise ValueError unless a model's inputs line up with this schema position by position."""
+        if n_features != self.n_features:
+            raise ValueError(f"model expects {n_features} features, schema provides {self.n_features}")
+        if feature_names is None:
+            return
+        for position, (field, name) in enumerate(zip(self.fields, feature_names)):
+            if name not in self.aliases[field]:
+                raise ValueError(
+                    f"feature {position} is '{name}' in the model but '{field}' in {self.request_model.__name__}"
+                )
+
+
+# ── PIPELINE SCHEMAS ───────────────────────────────────────────
+HEALTH_SCHEMA = FeatureSchema(HealthPredictionRequest, [
+    ("aqi", ()),
+    ("temperature", ()),
+    ("humidity", ()),
+    ("population_density", ()),
+    ("water_quality_index", ("water_quality",)),
+])
+
+FOREST_SCHEMA = FeatureSchema(ForestPredictionRequest, [
+    ("rainfall", ()),
+    ("urban_expansion_rate", ()),
+    ("previous_forest_area", ("forest_cover_ha",)),
+])
+
+TRAFFIC_SCHEMA = FeatureSchema(TrafficPredictionRequest, [
+    ("time_of_day", ()),
+    ("day_of_week", ()),
+    ("vehicle_count", ("traffic_density",)),
+    ("weather", ("temperature",)),
+])
+
+FEATURE_SCHEMAS = {
+    "health_model": HEALTH_SCHEMA,
+    "forest_model": FOREST_SCHEMA,
+    "traffic_model": TRAFFIC_SCHEMA,
+}
+
+
+class CompiledModel:
+    """
+    A tabular model bound to its validated FeatureSchema.
+
+    XGBoost models predict through `Booster.inplace_predict` on the float32
+    matrix, skipping DataFrame construction and per-call feature validation.
+    A flattened TreeEnsemble predicts the same matrix in NumPy. Other
+    estimators fall back to their own `predict` on the same matrix.
+    """
+    def __init__(self, model, schema: FeatureSchema):
+        self.model = model
+        self.schema = schema
+        self.classes = getattr(model, "classes_", None)
+        self.booster = model.get_booster() if hasattr(model, "get_booster") else None
+        self.ensemble = model if isinstance(model, TreeEnsemble) else None
+
+        if self.ensemble is not None:
+            schema.check(self.ensemble.feature_names, self.ensemble.n_features)
+        elif self.booster is not None:
+            schema.check(self.booster.feature_names, self.booster.num_features())
+            try:
+                # Honour early stopping the same way XGBModel.predict does
+                self.iteration_range = (0, model.best_iteration + 1)
+            except AttributeError:
+                self.iteration_range = (0, 0)
+        else:
+            schema.check(getattr(model, "feature_names_in_", None), getattr(model, "n_features_in_", schema.n_features))
+
+    def predict_matrix(self, features: np.ndarray) -> np.ndarray:
+        """Predict class labels (classifiers) or values (regressors) for a feature matrix."""
+        if self.ensemble is not None:
+            output = self.ensemble.predict(features)
+        elif self.booster is not None:
+            output = self.booster.inplace_predict(
+                features, iteration_range=self.iteration_range, validate_features=False
+            )
+        else:
+            return self.model.predict(features)
+
+        if self.classes is None:
+            return output
+        if output.ndim == 2:
+            return self.classes[np.argmax(output, axis=1)]
+        # Binary objectives return the positive-class probability
+        return self.classes[(output > 0.5).astype(np.int64)]
+
+    def predict(self, requests: Sequence) -> np.ndarray:
+        return self.predict_matrix(self.schema.matrix(requests))
+
+
+def compile_model(model_name: str, model):
+    """Bind a loaded tabular model to its pipeline schema; other models pass through unchanged."""
+    schema = FEATURE_SCHEMAS.get(model_name)
+    if schema is None or model is None:
+        return model
+    return CompiledModel(model, schema)
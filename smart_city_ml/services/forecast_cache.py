@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+import weakref
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from services.forecast_uncertainty import predict_with_uncertainty
+from services.inference_executor import get_executor
+from services.metrics import FORECAST_SECONDS
+
+logger = logging.getLogger("smart_city_ml")
+
+# Matches the `le=365` bound on the forecast request schemas
+MAX_HORIZON_DAYS = 365
+
+FORECAST_COLUMNS = ["ds", "yhat", "yhat_lower", "yhat_upper"]
+
+
+def predict_horizon(model, horizon_days: int, uncertainty: str = "full") -> pd.DataFrame:
+    """
+    Forecast the `horizon_days` after the model's training history (runs in a worker process),
+    with the interval computed as the `uncertainty` mode asks (see services/forecast_uncertainty.py).
+    Stage timings travel back with the frame in `attrs`, since metrics recorded in
+    the worker process would never reach /metrics.
+    """
+    started = time.perf_counter()
+    # Only the future rows are needed, so skip re-predicting the training history
+    future = model.make_future_dataframe(periods=horizon_days, include_history=False)
+    built = time.perf_counter()
+    forecast = predict_with_uncertainty(model, future, uncertainty)[FORECAST_COLUMNS].reset_index(drop=True)
+    forecast.attrs["stage_seconds"] = {
+        "future_frame": built - started,
+        "predict": time.perf_counter() - built,
+    }
+    return forecast
+
+
+class _CacheEntry:
+    def __init__(self, name: str, uncertainty: str, day: date, forecast: pd.DataFrame):
+        self.name = name
+        self.uncertainty = uncertainty
+        self.day = day
+        self.forecast = forecast
+
+
+class ForecastCache:
+    """
+    Holds one full-horizon Prophet forecast per model, uncertainty mode and calendar day.
+    Requests for any number of days are served as a slice of the cached frame. Loads and
+    reloads precompute the "full" mode; the others are computed on their first request.
+    A rollover thread (start_rollover) recomputes every cached frame right after local
+    midnight, so requests only read.
+
+    Entries are keyed weakly by the model object, so after a hot reload requests
+    still holding the previous model keep their forecast until they finish,
+    and it is dropped once that model is garbage collected.
+    """
+    def __init__(self, horizon_days: int = MAX_HORIZON_DAYS):
+        self.horizon_days = horizon_days
+        self._entries: "weakref.WeakKeyDictionary[object, Dict[str, _CacheEntry]]" = weakref.WeakKeyDictionary()
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._stop_rollover = threading.Event()
+        self._rollover: Optional[threading.Thread] = None
+
+    def _lock_for(self, name: str, uncertainty: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((name, uncertainty), threading.Lock())
+
+    def _entry(self, model, uncertainty: str) -> Optional[_CacheEntry]:
+        return self._entries.get(model, {}).get(uncertainty)
+
+    def get(self, name: str, model, days: int, uncertainty: str = "full") -> pd.DataFrame:
+        """
+        Return the first `days` rows of the cached forecast for `model`, computing it only
+        if this model and mode have none yet. Just after midnight the previous day's frame
+        is served until the rollover thread replaces it; a forecast from a different model
+        object is never served.
+        """
+        entry = self._entry(model, uncertainty)
+        if entry is None:
+            entry = self.refresh(name, model, uncertainty)
+        return entry.forecast.iloc[:days]
+
+    def refresh(self, name: str, model, uncertainty: str = "full") -> _CacheEntry:
+        """Compute and store the full-horizon forecast for `model` (single-flight per name and mode)."""
+        with self._lock_for(name, uncertainty):
+            today = date.today()
+            entry = self._entry(model, uncertainty)
+            if entry is not None and entry.day == today:
+                return entry
+
+            started = time.perf_counter()
+            forecast = get_executor().offload(predict_horizon, model, self.horizon_days, uncertainty)
+            for stage, seconds in forecast.attrs.pop("stage_seconds", {}).items():
+                FORECAST_SECONDS.labels(name, stage).observe(seconds)
+            FORECAST_SECONDS.labels(name, "total").observe(time.perf_counter() - started)
+
+            entry = _CacheEntry(name, uncertainty, today, forecast)
+            with self._locks_guard:
+                self._entries.setdefault(model, {})[uncertainty] = entry
+            logger.info(f"Forecast cache refreshed for {name} ({self.horizon_days} days, {uncertainty} uncertainty)")
+            return entry
+
+    def refresh_all(self):
+        """Recompute every cached forecast that is not from today, one model and mode at a time."""
+        with self._locks_guard:
+            stale = [(model, entry.name, entry.uncertainty)
+                     for model, entries in self._entries.items() for entry in entries.values()
+                     if entry.day != date.today()]
+        for model, name, uncertainty in stale:
+            try:
+                self.refresh(name, model, uncertainty)
+            except Exception as e:
+                logger.error(f"Day rollover forecast refresh failed for {name} ({uncertainty}): {e}")
+
+    def start_rollover(self):
+        """Start the daemon thread that runs refresh_all() just after each local midnight."""
+        if self._rollover is not None:
+            return
+        self._stop_rollover.clear()
+
+        def _seconds_to_midnight() -> float:
+            now = datetime.now()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            # A second past midnight, so date.today() has already moved on
+            return (midnight - now).total_seconds() + 1.0
+
+        def _run():
+            while not self._stop_rollover.wait(_seconds_to_midnight()):
+                self.refresh_all()
+
+        self._rollover = threading.Thread(target=_run, name="forecast-rollover", daemon=True)
+        self._rollover.start()
+
+    def stop_rollover(self):
+        self._stop_rollover.set()
+        self._rollover = None
+
+    def invalidate(self):
+        """Drop every cached forecast (when the registry reloads all models)."""
+        self._entries.clear()
@@ -0,0 +1,143 @@
+import io
+import json
+import logging
+from typing import Iterator, Optional
+
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional; the other formats need only pandas
+    pa = None
+
+logger = logging.getLogger("smart_city_ml")
+
+# ── MEDIA TYPES ────────────────────────────────────────────────
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.smartcity.columnar+json"
+NDJSON = "application/x-ndjson"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# Short names accepted by the `format` query parameter
+FORMATS = {
+    "json": JSON,
+    "columnar": COLUMNAR_JSON,
+    "ndjson": NDJSON,
+    "arrow": ARROW_STREAM,
+}
+
+# OpenAPI description of the alternative bodies, for the forecast routes' `responses=`
+FORECAST_RESPONSES = {
+    200: {"content": {COLUMNAR_JSON: {}, NDJSON: {}, ARROW_STREAM: {}}},
+    406: {"description": "Arrow output requested but pyarrow is not installed"},
+}
+
+# Rows per chunk written to a streaming response
+STREAM_CHUNK_ROWS = 128
+
+# Response column -> forecast frame column, in output order
+_COLUMNS = {
+    "date": "ds",
+    "prediction": "yhat",
+    "lower_bound": "yhat_lower",
+    "upper_bound": "yhat_upper",
+}
+
+
+def negotiate(accept: Optional[str], format: Optional[str] = None) -> str:
+    """
+    Pick the forecast media type from an explicit `format` name, else from the
+    Accept header (highest q-value wins), defaulting to the standard JSON body.
+    """
+    if format:
+        media_type = FORMATS.get(format.lower())
+        if media_type is None:
+            raise HTTPException(status_code=400, detail=f"Unknown format '{format}', expected one of {sorted(FORMATS)}")
+        return _available(media_type)
+
+    best, best_q = JSON, 0.0
+    for part in (accept or "").split(","):
+        media_type, _, params = part.strip().partition(";")
+        media_type = media_type.strip().lower()
+        if media_type not in FORMATS.values():
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        # Arrow is skipped rather than refused when the client would accept something else
+        if q > best_q and (media_type != ARROW_STREAM or pa is not None):
+            best, best_q = media_type, q
+    return best
+
+
+def _available(media_type: str) -> str:
+    if media_type == ARROW_STREAM and pa is None:
+        raise HTTPException(status_code=406, detail="Arrow output requires pyarrow, which is not installed")
+    return media_type
+
+
+def to_output_frame(forecast: pd.DataFrame) -> pd.DataFrame:
+    """Rename a Prophet forecast slice to response columns, dates as strings and values rounded like the JSON body."""
+    output = pd.DataFrame({
+        name: forecast[column].round(2) if name != "date" else forecast[column].dt.strftime("%Y-%m-%d")
+        for name, column in _COLUMNS.items()
+    })
+    # uncertainty="none" forecasts have no bounds; send nulls rather than NaN, which is not valid JSON
+    for name in ("lower_bound", "upper_bound"):
+        if output[name].isna().any():
+            output[name] = output[name].astype(object).where(output[name].notna(), None)
+    return output.reset_index(drop=True)
+
+
+def forecast_response(forecast: pd.DataFrame, media_type: str, model_version: Optional[str]) -> Response:
+    """
+    Serialize a forecast frame as columnar JSON, NDJSON or an Arrow IPC stream.
+    Every format is built from whole columns, never from per-row Python objects.
+    """
+    output = to_output_frame(forecast)
+    headers = {"X-Model-Version": model_version or ""}
+
+    if media_type == COLUMNAR_JSON:
+        body = {"model_version": model_version, "forecast": {name: output[name].tolist() for name in output.columns}}
+        return Response(json.dumps(body), media_type=COLUMNAR_JSON, headers=headers)
+
+    if media_type == NDJSON:
+        return StreamingResponse(_ndjson_chunks(output), media_type=NDJSON, headers=headers)
+
+    if media_type == ARROW_STREAM:
+        return StreamingResponse(_arrow_chunks(output, model_version), media_type=ARROW_STREAM, headers=headers)
+
+    raise ValueError(f"forecast_response does not render {media_type}")
+
+
+def _ndjson_chunks(output: pd.DataFrame) -> Iterator[str]:
+    for start in range(0, len(output), STREAM_CHUNK_ROWS):
+        chunk = output.iloc[start:start + STREAM_CHUNK_ROWS]
+        # pandas writes the records in C; every line ends with a newline
+        yield chunk.to_json(orient="records", lines=True).rstrip("\n") + "\n"
+
+
+def _arrow_chunks(output: pd.DataFrame, model_version: Optional[str]) -> Iterator[bytes]:
+    table = pa.Table.from_pandas(output, preserve_index=False)
+    table = table.replace_schema_metadata({"model_version": model_version or ""})
+    buffer = io.BytesIO()
+
+    def _drain() -> bytes:
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    # Each record batch is sent as soon as it is written; the last chunk is the end-of-stream marker
+    with pa.ipc.new_stream(buffer, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=STREAM_CHUNK_ROWS):
+            writer.write_batch(batch)
+            yield _drain()
+    yield _drain()
@@ -0,0 +1,100 @@
+"""
+Uncertainty modes for the Prophet forecasts served by /predict/aqi and /predict/water.
+
+Prophet's default intervals come from simulating `uncertainty_samples` (1000) future
+paths of trend changes and observation noise per forecast, which dominates the cost
+of `model.predict`. The modes trade interval accuracy for latency:
+
+  full      the model's own sampling (the reference)
+  reduced   the same simulation with ML_FORECAST_REDUCED_SAMPLES paths
+  analytic  no simulation: a normal interval whose variance is the exact variance of
+            Prophet's simulated trend shifts plus the observation noise
+  none      point forecast only; lower and upper bounds are omitted
+
+Accuracy against full sampling (benchmarks/forecast_uncertainty.py on the trained AQI
+and water models, 30/90/365-day horizons; mean absolute bound error as a share of the
+full interval's half-width):
+
+  full      4-5% between two runs of full sampling itself (its Monte Carlo noise)
+  reduced   11-12% with 100 samples: noisier bounds, no systematic bias
+  analytic  3-4%, below full sampling's own run-to-run noise; mean width within 0.3%
+            of the simulated interval. These models' intervals are dominated by
+            observation noise. The variance also matches when simulated trend changes
+            dominate, but those are rare, large jumps rather than normal: on a synthetic
+            series with strong changepoints the analytic interval was 2.3x / 1.3x / 1.07x
+            the simulated width at 30 / 90 / 365 days, i.e. conservative.
+  none      no interval
+
+Latency of one uncached 30/90/365-day forecast on one core: full 50/65/135 ms,
+reduced 35/35/45 ms, analytic and none 15-30 ms at every horizon.
+"""
+import copy
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import config
+
+UNCERTAINTY_MODES = ("full", "reduced", "analytic", "none")
+
+
+def _trend_shift_variance(model, t: np.ndarray) -> np.ndarray:
+    """
+    Variance (in scaled units) of the simulated future trend offset at each future time `t` (> 1).
+
+    Prophet draws a slope change at each future step with probability p = S * dt (S
+    changepoints in the history, dt the step in scaled time), of Laplace(0, b) size with b the
+    mean absolute fitted change, averages neighbouring steps and integrates twice. The
+    offset after j steps is therefore dt * sum_m (j - m + 0.5) * change_m, whose variance
+    is dt^2 * p * 2b^2 * sum_{k<j} (k + 0.5)^2.
+    """
+    dt = np.diff(t).mean() if len(t) > 1 else np.diff(model.history["t"]).mean()
+    p = len(model.changepoints_t) * dt
+    b = np.mean(np.abs(model.params["delta"][0])) + 1e-8
+    steps = np.arange(len(t))
+    return dt ** 2 * p * 2 * b ** 2 * np.cumsum((steps + 0.5) ** 2)
+
+def add_analytic_intervals(model, forecast: pd.DataFrame) -> pd.DataFrame:
+    """Fill yhat_lower/yhat_upper of a point forecast (uncertainty_samples=0) in closed form."""
+    t = ((forecast["ds"] - model.start) / model.t_scale).to_numpy()
+    trend_sd = np.zeros(len(forecast))
+    future = t > 1
+    if model.growth == "linear" and future.any():
+        trend_sd[future] = np.sqrt(_trend_shift_variance(model, t[future])) * model.y_scale
+    noise_sd = float(model.params["sigma_obs"][0][0]) * model.y_scale
+    # Trend shifts are scaled by the multiplicative seasonality, noise is not
+    scale = np.abs(1 + forecast["multiplicative_terms"].to_numpy())
+    sd = np.sqrt((trend_sd * scale) ** 2 + noise_sd ** 2)
+
+    z = NormalDist().inv_cdf((1 + model.interval_width) / 2)
+    forecast["yhat_lower"] = forecast["yhat"] - z * sd
+    forecast["yhat_upper"] = forecast["yhat"] + z * sd
+    return forecast
+
+def predict_with_uncertainty(model, future: pd.DataFrame, uncertainty: str = "full") -> pd.DataFrame:
+    """
+    model.predict(future) with the interval computed as `uncertainty` asks. The serving
+    model is never modified: the other modes predict with a shallow copy.
+    """
+    if uncertainty == "full":
+        return model.predict(future)
+    if uncertainty not in UNCERTAINTY_MODES:
+        raise ValueError(f"Unknown uncertainty mode '{uncertainty}', expected one of {UNCERTAINTY_MODES}")
+
+    # The closed form covers MAP fits with linear or flat growth; others are sampled instead
+    if uncertainty == "analytic" and (model.growth == "logistic" or model.mcmc_samples > 0):
+        uncertainty = "reduced"
+
+    variant = copy.copy(model)
+    if uncertainty == "reduced":
+        variant.uncertainty_samples = min(model.uncertainty_samples, config.ML_FORECAST_REDUCED_SAMPLES)
+        return variant.predict(future)
+
+    variant.uncertainty_samples = 0
+    forecast = variant.predict(future)
+    if uncertainty == "analytic":
+        return add_analytic_intervals(model, forecast)
+    forecast["yhat_lower"] = np.nan
+    forecast["yhat_upper"] = np.nan
+    return forecast
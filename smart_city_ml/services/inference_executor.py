@@ -0,0 +1,172 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+import config
+from services.metrics import EXECUTOR_QUEUE_DEPTH, INFERENCE_REJECTED
+from services.profiler import current_session
+
+logger = logging.getLogger("smart_city_ml")
+
+
+class InferenceUnavailable(Exception):
+    """Base class for requests the executor refused or could not finish."""
+    status_code = 503
+
+    def __init__(self, model_name: str, detail: str):
+        super().__init__(detail)
+        self.model_name = model_name
+        self.detail = detail
+
+
+class InferenceOverloaded(InferenceUnavailable):
+    status_code = 503
+
+
+class InferenceTimeout(InferenceUnavailable):
+    status_code = 504
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model calls off the asyncio event loop.
+
+    Request-path work goes to a bounded thread pool, with a per-model concurrency
+    limit and a per-model queue bound that rejects excess requests with a 503.
+    CPU-heavy Prophet forecasts can be offloaded to a process pool so they never
+    hold the GIL of the serving worker.
+    """
+    def __init__(
+        self,
+        thread_workers: int = config.ML_INFERENCE_THREADS,
+        process_workers: int = config.ML_INFERENCE_PROCESSES,
+        concurrency: Optional[Dict[str, int]] = None,
+        max_queue: int = config.ML_INFERENCE_MAX_QUEUE,
+        timeout: float = config.ML_INFERENCE_TIMEOUT,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.concurrency = dict(config.ML_INFERENCE_CONCURRENCY if concurrency is None else concurrency)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.timeouts = dict(config.ML_INFERENCE_TIMEOUTS if timeouts is None else timeouts)
+
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[str, int] = {}
+
+    @property
+    def threads(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="inference")
+        return self._threads
+
+    @property
+    def processes(self) -> Optional[ProcessPoolExecutor]:
+        if self._processes is None and self.process_workers > 0:
+            # "spawn" avoids forking a parent that already runs event-loop and pool threads
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._processes
+
+    def _limit_for(self, model_name: str) -> int:
+        return max(1, self.concurrency.get(model_name, self.thread_workers))
+
+    def _timeout_for(self, model_name: str) -> float:
+        return self.timeouts.get(model_name, self.timeout)
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Requests currently waiting or running, per model."""
+        return {name: count for name, count in self._pending.items() if count}
+
+    async def run(self, model_name: str, fn: Callable, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` on the thread pool under `model_name`'s limits.
+        Raises InferenceOverloaded when the model's queue is full and
+        InferenceTimeout when the call does not finish within the timeout.
+        """
+        limit = self._limit_for(model_name)
+        timeout = self._timeout_for(model_name)
+        pending = self._pending.get(model_name, 0)
+        if pending >= limit + self.max_queue:
+            INFERENCE_REJECTED.labels(model_name, "overloaded").inc()
+            raise InferenceOverloaded(model_name, f"{model_name} is saturated ({pending} requests in flight), retry later")
+
+        semaphore = self._semaphores.get(model_name)
+        if semaphore is None:
+            semaphore = self._semaphores[model_name] = asyncio.Semaphore(limit)
+
+        session = current_session()
+        if session is not None:
+            # Profiled request (see services/profiler.py): profile the call on its worker thread too
+            fn = session.wrap(fn)
+
+        self._pending[model_name] = pending + 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            self._pending[model_name] -= 1
+            raise
+
+        loop = asyncio.get_running_loop()
+
+        def _release():
+            semaphore.release()
+            self._pending[model_name] -= 1
+
+        def _finished(_):
+            try:
+                loop.call_soon_threadsafe(_release)
+            except RuntimeError:
+                pass  # the event loop is already closed (shutdown)
+
+        try:
+            call = self.threads.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            _release()
+            raise
+        # A timed-out call keeps running on its thread, so it keeps the model's slot and
+        # queue count until it really finishes: timed-out Prophet or Monte Carlo calls
+        # cannot pile up past their limit and fill the pool the fast models share.
+        call.add_done_callback(_finished)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(call), timeout=timeout)
+        except asyncio.TimeoutError:
+            INFERENCE_REJECTED.labels(model_name, "timeout").inc()
+            raise InferenceTimeout(model_name, f"{model_name} inference timed out after {timeout}s")
+
+    def offload(self, fn: Callable, *args):
+        """
+        Run a picklable CPU-bound `fn(*args)` in the process pool and block for the result.
+        Falls back to calling it inline when the process pool is disabled, and for
+        profiled requests, so the work shows up in their profile.
+        Meant to be called from a worker thread, never from the event loop.
+        """
+        pool = self.processes
+        if pool is None or current_session() is not None:
+            return fn(*args)
+        return pool.submit(fn, *args).result()
+
+    def shutdown(self, wait: bool = False):
+        """Stop both pools; they are recreated on next use. `wait` joins their threads and processes."""
+        if self._threads is not None:
+            self._threads.shutdown(wait=wait, cancel_futures=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait, cancel_futures=True)
+            self._processes = None
+        self._semaphores.clear()
+
+
+executor = InferenceExecutor()
+EXECUTOR_QUEUE_DEPTH.set_function(lambda: {(name,): count for name, count in executor._pending.items()})
+
+def get_executor() -> InferenceExecutor:
+    return executor
@@ -0,0 +1,292 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import config
+
+# Latency buckets in seconds, from sub-millisecond feature builds to multi-second Prophet forecasts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base for in-process metrics rendered in the Prometheus text format."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.register(self)
+
+    def labels(self, *values):
+        """Child series for one combination of label values (same call shape as prometheus_client)."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if not config.ML_METRICS_ENABLED:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in list(self._children.items())
+        ]
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        if not config.ML_METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the wall-clock duration of the `with` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    A gauge read at scrape time from `fn`, which returns {label values: value}.
+    Used for state that already lives elsewhere (queue depths, cache sizes),
+    so nothing is updated on the request path.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def set_function(self, fn: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.fn = fn
+
+    def samples(self) -> List[str]:
+        if self.fn is None:
+            return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self.fn().items()
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ── SERVICE METRICS ────────────────────────────────────────────
+REQUEST_SECONDS = Histogram(
+    "ml_request_seconds", "End-to-end HTTP request latency, including validation and serialization.",
+    ("method", "endpoint", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "ml_stage_seconds", "Latency of one stage (features, inference, encode) of a prediction endpoint.",
+    ("endpoint", "stage"),
+)
+FORECAST_SECONDS = Histogram(
+    "ml_forecast_seconds", "Prophet full-horizon forecast refresh time by stage (future_frame, predict, total).",
+    ("model", "stage"),
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "ml_model_load_seconds", "Time to load, compile and warm a model artifact.",
+    ("model",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+MODEL_LOADS = Counter(
+    "ml_model_loads_total", "Model load attempts by outcome (loaded, failed, missing, unchanged).",
+    ("model", "outcome"),
+)
+MOCK_FALLBACKS = Counter(
+    "ml_mock_fallback_total", "Requests answered with mock data because the model is not loaded.",
+    ("model",),
+)
+INFERENCE_REJECTED = Counter(
+    "ml_inference_rejected_total", "Inference calls refused by the executor (overloaded) or abandoned (timeout).",
+    ("model", "reason"),
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "ml_executor_queue_depth", "Inference calls waiting or running on the executor.",
+    ("model",),
+)
+MICROBATCH_SIZE = Histogram(
+    "ml_microbatch_size", "Rows per coalesced single-row predict call.",
+    ("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+ZONE_MODEL_LOOKUPS = Counter(
+    "ml_zone_model_lookups_total",
+    "Zone model lookups by outcome (hit, miss, fallback to the city-wide model, failed).",
+    ("model", "outcome"),
+)
+ZONE_MODEL_EVICTIONS = Counter(
+    "ml_zone_model_evictions_total", "Zone models evicted from the zone cache to stay within its memory budget.",
+    ("model",),
+)
+ZONE_CACHE_BYTES = Gauge(
+    "ml_zone_cache_bytes", "Artifact bytes of the zone models resident in the zone cache.",
+)
+ZONE_CACHE_MODELS = Gauge(
+    "ml_zone_cache_models", "Zone models resident in the zone cache.",
+    ("model",),
+)
+MODEL_REFIT_SECONDS = Histogram(
+    "ml_model_refit_seconds", "Time to refit a Prophet model on ingested observations, by stage (load, fit, install).",
+    ("model", "stage"),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+MODEL_REFITS = Counter(
+    "ml_model_refits_total", "Online Prophet refits by outcome (installed, skipped, failed).",
+    ("model", "outcome"),
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "ml_response_cache_lookups_total", "Quantized response cache lookups by outcome (hit, miss).",
+    ("model", "outcome"),
+)
+RESPONSE_CACHE_ENTRIES = Gauge(
+    "ml_response_cache_entries", "Responses held in the quantized response cache.",
+    ("model",),
+)
+RESPONSE_CACHE_HIT_RATIO = Gauge(
+    "ml_response_cache_hit_ratio", "Share of response cache lookups answered from the cache since startup.",
+    ("model",),
+)
+
+
+def stage_timer(endpoint: str, stage: str):
+    """`with stage_timer("/predict/aqi", "inference"): ...` records into ml_stage_seconds."""
+    return STAGE_SECONDS.labels(endpoint, stage).time()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request by route template and status.
+    Avoids BaseHTTPMiddleware so streaming responses are not buffered.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.ML_METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            # FastAPI stores the matched route in the scope; the template keeps label cardinality bounded
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], endpoint, status[0]).observe(time.perf_counter() - started)
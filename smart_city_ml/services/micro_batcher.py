@@ -0,0 +1,128 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import config
+from services.inference_executor import get_executor
+from services.metrics import MICROBATCH_SIZE
+
+logger = logging.getLogger("smart_city_ml")
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row requests for one model into a single predict call.
+
+    Rows are collected for up to `window_ms` or until `max_batch_size` rows are waiting,
+    then `predict_fn(model, rows)` runs once on the inference executor and each caller
+    receives the result at its own row's position.
+    """
+    def __init__(
+        self,
+        model_name: str,
+        predict_fn: Callable[[Any, List[Any]], List[Any]],
+        window_ms: float = config.ML_MICROBATCH_WINDOW_MS,
+        max_batch_size: int = config.ML_MICROBATCH_MAX_SIZE,
+        enabled: bool = config.ML_MICROBATCH_ENABLED,
+    ):
+        self.model_name = model_name
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.enabled = enabled and self.window > 0 and self.max_batch_size > 1
+
+        self._pending: List[Tuple[Any, Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # In-flight batch calls; the event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, model, row):
+        """Predict a single row, sharing the model call with concurrent submitters."""
+        if not self.enabled:
+            return (await get_executor().run(self.model_name, self.predict_fn, model, [row]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((model, row, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    async def submit_many(self, model, rows: List[Any]) -> List[Any]:
+        """Predict several rows through the batcher; results are in input order."""
+        return list(await asyncio.gather(*(self.submit(model, row) for row in rows)))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        # Group by model object so a reload mid-window never mixes models in one call
+        groups: Dict[int, Tuple[Any, list]] = {}
+        for model, row, future in batch:
+            groups.setdefault(id(model), (model, []))[1].append((row, future))
+        # A batch serves several requests, so it runs in a fresh context rather than the one
+        # of the request that opened the window (which would put it in that request's profile)
+        loop = asyncio.get_running_loop()
+        for model, entries in groups.values():
+            task = loop.create_task(self._run(model, entries), context=contextvars.Context())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, model, entries: list):
+        rows = [row for row, _ in entries]
+        MICROBATCH_SIZE.labels(self.model_name).observe(len(rows))
+        try:
+            results = await get_executor().run(self.model_name, self.predict_fn, model, rows)
+        except asyncio.CancelledError:
+            for _, future in entries:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in entries:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(entries, results):
+            # Callers that disconnected have already cancelled their future
+            if not future.done():
+                future.set_result(result)
+
+    async def shutdown(self):
+        """Cancel rows still waiting for their window and the batch calls in flight."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        for _, _, future in batch:
+            future.cancel()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+
+def register_batcher(model_name: str, predict_fn: Callable[[Any, List[Any]], List[Any]]) -> MicroBatcher:
+    """Create (or return the existing) micro-batcher for a model's single-row endpoint."""
+    batcher = _batchers.get(model_name)
+    if batcher is None:
+        batcher = _batchers[model_name] = MicroBatcher(model_name, predict_fn)
+    return batcher
+
+def get_batchers() -> Dict[str, MicroBatcher]:
+    return _batchers
+
+async def shutdown_batchers():
+    for batcher in _batchers.values():
+        await batcher.shutdown()
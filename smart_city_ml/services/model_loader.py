@@ -1,51 +1,358 @@
 import os
+import time
+import asyncio
+import hashlib
+import threading
 import joblib
 import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import config
+from services.forecast_cache import ForecastCache
+from services.feature_schema import CompiledModel, compile_model
+from services.inference_executor import InferenceUnavailable
+from services.metrics import MODEL_LOAD_SECONDS, MODEL_LOADS
+from services.tree_ensemble import TreeEnsemble, TREES_SUFFIX
+from services.zone_models import ZoneModelCache, register_zone_gauges
 
 logger = logging.getLogger("smart_city_ml")
 
+MODEL_FILES = {
+    "aqi_model": "aqi.pkl",
+    "water_model": "water.pkl",
+    "health_model": "health.pkl",
+    "forest_model": "forest.pkl",
+    "traffic_model": "traffic.pkl"
+}
+
+# Models whose forecasts are precomputed by the registry's ForecastCache
+FORECAST_MODELS = ("aqi_model", "water_model")
+
+# Zone-specific artifacts live in <models_dir>/zones/<zone id>/, e.g. models/zones/downtown/health.pkl
+ZONES_SUBDIR = "zones"
+
+# Reported as the model version of responses served by the mock fallbacks
+MOCK_MODEL_VERSION = "mock"
+
+
+class ModelNotReady(InferenceUnavailable):
+    """The model is still being loaded in the background."""
+    status_code = 503
+
+
+class ModelStatus:
+    """Load state of one model artifact, as reported by /ready."""
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.state = "pending"  # pending | loading | loaded | missing | failed
+        self.version: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+class LoadedModel:
+    """A model object together with the artifact version it was loaded from."""
+    def __init__(self, model, version: str):
+        self.model = model
+        self.version = version
+
+
+def _fingerprint(filepath: str) -> Tuple[int, int]:
+    """Cheap change detector for polling: modification time and size."""
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+def _content_version(filepath: str) -> str:
+    """Short content hash identifying an artifact independent of its timestamp."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
 class ModelRegistry:
-    """Singleton registry to hold loaded ML models."""
+    """
+    Singleton registry to hold loaded ML models.
+
+    Each model is held as a LoadedModel and replaced with a single dict assignment,
+    so a hot reload swaps versions atomically: requests that already checked out
+    a model keep using it, new requests get the new version.
+    """
     def __init__(self):
-        self.aqi_model = None
-        self.water_model = None
-        self.health_model = None
-        self.forest_model = None
-        self.traffic_model = None
+        self.models_dir = config.ML_MODELS_DIR
+        self.lazy = False
+        self.mmap = config.ML_MODEL_MMAP
+        self.tree_evaluator = config.ML_TREE_EVALUATOR
+        # Set by the pre-fork parent: workers inherit the loaded models and must not reload them
+        self.preloaded = False
+        self._models: Dict[str, LoadedModel] = {}
+        # Fingerprint of the last artifact a load was attempted from, successful or not
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        self._locks = {attr: threading.Lock() for attr in MODEL_FILES}
+        self.status = {attr: ModelStatus(filename) for attr, filename in MODEL_FILES.items()}
+        # Precomputed Prophet forecasts for the AQI and Water pipelines
+        self.forecasts = ForecastCache()
+        # Zone-specific models, loaded on demand within a memory budget
+        self.zones = ZoneModelCache(self, config.ML_ZONE_CACHE_MB * 1024 * 1024,
+                                    config.ML_ZONE_NEGATIVE_CACHE_TTL, config.ML_ZONE_NEGATIVE_CACHE_SIZE)
+        self._stop_watching = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def aqi_model(self):
+        return self.get("aqi_model")
+
+    @property
+    def water_model(self):
+        return self.get("water_model")
+
+    @property
+    def health_model(self):
+        return self.get("health_model")
+
+    @property
+    def forest_model(self):
+        return self.get("forest_model")
+
+    @property
+    def traffic_model(self):
+        return self.get("traffic_model")
+
+    def zone_dir(self, zone: str) -> str:
+        """Directory holding a zone's own artifacts, named like the city-wide ones."""
+        return os.path.join(self.models_dir, ZONES_SUBDIR, zone)
+
+    def artifact_path(self, attr: str, directory: Optional[str] = None) -> str:
+        """
+        File the model is loaded from: its `.pkl`, or with ML_TREE_EVALUATOR the
+        flattened `.trees.npz` export when that is at least as new as the `.pkl`.
+        `directory` defaults to the models directory (the city-wide models).
+        """
+        filepath = os.path.join(directory or self.models_dir, self.status[attr].filename)
+        if not self.tree_evaluator or attr in FORECAST_MODELS:
+            return filepath
+        trees_path = os.path.splitext(filepath)[0] + TREES_SUFFIX
+        try:
+            if os.stat(trees_path).st_mtime_ns >= os.stat(filepath).st_mtime_ns:
+                return trees_path
+        except FileNotFoundError:
+            # No export, or no pickle to compare it against
+            if not os.path.exists(filepath) and os.path.exists(trees_path):
+                return trees_path
+        return filepath
+
+    def checkout(self, attr: str) -> Tuple[Optional[object], Optional[str]]:
+        """
+        Return the current (model, version) pair, or (None, None) if the artifact is
+        missing or broken. Never loads, so it is safe on the event loop: a model that is
+        still loading (or, in lazy mode, not loaded yet) raises ModelNotReady instead of
+        serving mock data. Request handlers use checkout_zone(), which does the lazy load
+        on a worker thread; blocking callers off the loop can call load() first.
+        """
+        state = self.status[attr].state
+        if state == "loading" or (state == "pending" and self.lazy):
+            raise ModelNotReady(attr, f"{attr} is still loading, retry later")
+
+        loaded = self._models.get(attr)
+        if loaded is None:
+            return None, None
+        return loaded.model, loaded.version
+
+    async def checkout_zone(self, attr: str, zone: Optional[str]) -> Tuple[Optional[object], Optional[str]]:
+        """
+        checkout() for a request, optionally naming a zone. The zone's own model is served
+        from the zone cache, or loaded on a worker thread on a miss; zones without an
+        artifact of their own (and requests without a zone) get the city-wide model. In
+        lazy mode the first request for a model loads it on a worker thread, since reading,
+        compiling and warming it (a 365-day forecast for Prophet) takes up to seconds.
+        """
+        if zone is not None:
+            loaded = self.zones.lookup(attr, zone)
+            if loaded is None and not self.zones.known_missing(attr, zone):
+                loaded = await asyncio.to_thread(self.zones.load, attr, zone)
+            if loaded is not None:
+                return loaded.model, loaded.version
+        if self.lazy and self.status[attr].state in ("pending", "loading"):
+            await asyncio.to_thread(self.load, attr)
+        return self.checkout(attr)
+
+    def get(self, attr: str):
+        return self.checkout(attr)[0]
+
+    def load(self, attr: str):
+        """Initial load of one model artifact (single-flight per model)."""
+        with self._locks[attr]:
+            if self.status[attr].state in ("loaded", "missing", "failed"):
+                return
+            self._load_locked(attr)
+
+    def reload(self, attr: str, force: bool = False) -> bool:
+        """
+        Hot-reload one model if its artifact changed on disk (or unconditionally with `force`).
+        The new artifact is loaded and warmed while the old version keeps serving; on any
+        failure the old version stays in place. Returns True if a new version was swapped in.
+        """
+        with self._locks[attr]:
+            status = self.status[attr]
+            # Lazy workers never load models they have not been asked for
+            if self.lazy and status.state == "pending":
+                return False
+
+            filepath = self.artifact_path(attr)
+            if not force:
+                if not os.path.exists(filepath) or self._seen.get(attr) == _fingerprint(filepath):
+                    return False
+            return self._load_locked(attr)
+
+    def _load_locked(self, attr: str) -> bool:
+        status = self.status[attr]
+        filepath = self.artifact_path(attr)
+        current = self._models.get(attr)
+
+        if not os.path.exists(filepath):
+            MODEL_LOADS.labels(attr, "missing").inc()
+            if current is None:
+                status.state = "missing"
+            logger.warning(f"Model file missing: {filepath}")
+            return False
+
+        if current is None:
+            status.state = "loading"
+        started = time.perf_counter()
+        self._seen[attr] = _fingerprint(filepath)
+        try:
+            version = _content_version(filepath)
+            if current is not None and current.version == version:
+                # Touched but unchanged: keep serving the loaded object
+                MODEL_LOADS.labels(attr, "unchanged").inc()
+                return False
+            model = self.read_artifact(attr, filepath)
+        except Exception as e:
+            MODEL_LOADS.labels(attr, "failed").inc()
+            status.error = str(e)
+            if current is None:
+                status.state = "failed"
+                logger.error(f"Failed to load {status.filename}: {e}")
+            else:
+                logger.error(f"Reload of {status.filename} failed, still serving {current.version}: {e}")
+            return False
+
+        # Atomic swap: in-flight requests keep the LoadedModel they checked out
+        self._models[attr] = LoadedModel(model, version)
+        load_seconds = time.perf_counter() - started
+        MODEL_LOAD_SECONDS.labels(attr).observe(load_seconds)
+        MODEL_LOADS.labels(attr, "loaded").inc()
+        status.load_seconds = round(load_seconds, 4)
+        status.version = version
+        status.error = None
+        status.state = "loaded"
+        if current is None:
+            logger.info(f"Successfully loaded {os.path.basename(filepath)} ({version}) in {status.load_seconds:.2f}s")
+        else:
+            logger.info(f"Hot-reloaded {os.path.basename(filepath)}: {current.version} -> {version} in {status.load_seconds:.2f}s")
+        return True
+
+    def load_artifact(self, attr: str, filepath: str) -> LoadedModel:
+        """Load an artifact outside the city-wide slots (used for zone models)."""
+        return LoadedModel(self.read_artifact(attr, filepath), _content_version(filepath))
+
+    def read_artifact(self, attr: str, filepath: str):
+        """Deserialize, compile and warm one artifact; raises if it cannot serve `attr`."""
+        if filepath.endswith(TREES_SUFFIX):
+            raw_model = TreeEnsemble.load(filepath)
+        else:
+            # Arrays in uncompressed joblib artifacts are mapped read-only instead of copied
+            raw_model = joblib.load(filepath, mmap_mode="r" if self.mmap else None)
+        # Tabular models are bound to their request schema here, so a
+        # feature-order mismatch fails the load rather than every request
+        model = compile_model(attr, raw_model)
+        self._warm(attr, model)
+        return model
+
+    def _warm(self, attr: str, model):
+        """Run a test prediction so a broken artifact is rejected before it serves traffic."""
+        if attr in FORECAST_MODELS:
+            # Doubles as precomputing the forecast cache for the new model
+            self.forecasts.refresh(attr, model)
+        elif isinstance(model, CompiledModel):
+            model.predict_matrix(np.zeros((1, model.schema.n_features), dtype=np.float32))
+
+    def is_ready(self) -> bool:
+        """True once no model is waiting on an eager background load."""
+        return all(s.state != "loading" for s in self.status.values())
+
+    def watch(self, interval: float = config.ML_MODEL_RELOAD_INTERVAL):
+        """Poll the models directory every `interval` seconds and hot-reload changed artifacts."""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop_watching.clear()
+
+        def _poll():
+            while not self._stop_watching.wait(interval):
+                for attr in MODEL_FILES:
+                    try:
+                        self.reload(attr)
+                    except Exception as e:
+                        logger.error(f"Model watcher failed for {attr}: {e}")
+                try:
+                    self.zones.drop_stale()
+                except Exception as e:
+                    logger.error(f"Model watcher failed for zone models: {e}")
+
+        self._watcher = threading.Thread(target=_poll, name="model-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching {self.models_dir}/ for new model artifacts every {interval:g}s")
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        self._watcher = None
+
 
 registry = ModelRegistry()
+register_zone_gauges(registry.zones)
 
-def load_models(models_dir: str = "models"):
+def load_models(models_dir: str = config.ML_MODELS_DIR, mode: str = config.ML_MODEL_LOADING, block: bool = False):
     """
     Load all pre-trained models from the specified directory.
     If a model file is missing, the service logs a warning instead of hard crashing,
     useful for graceful degradation or initial setup phases.
+
+    In "eager" mode the models load in parallel on background threads so the server
+    can accept traffic (and report progress on /ready) immediately; in "lazy" mode
+    each model is loaded by the first request that needs it, so a worker only pays
+    the memory of the models it actually serves. With `block` eager loading finishes
+    before this returns (used by the pre-fork parent, see serve_prefork.py).
     """
+    registry.models_dir = models_dir
+    registry.lazy = mode == "lazy"
+    for status in registry.status.values():
+        status.state = "pending"
+    registry._models.clear()
+    registry._seen.clear()
+    registry.zones.clear()
+    registry.forecasts.invalidate()
+
+    if registry.lazy:
+        logger.info("Lazy model loading enabled; models load on first request.")
+        return
+
     logger.info("Loading pre-trained models...")
-    
-    model_files = {
-        "aqi_model": "aqi.pkl",
-        "water_model": "water.pkl",
-        "health_model": "health.pkl",
-        "forest_model": "forest.pkl",
-        "traffic_model": "traffic.pkl"
-    }
-
-    loaded_count = 0
-    for attr, filename in model_files.items():
-        filepath = os.path.join(models_dir, filename)
-        if os.path.exists(filepath):
-            try:
-                model = joblib.load(filepath)
-                setattr(registry, attr, model)
-                logger.info(f"Successfully loaded {filename}")
-                loaded_count += 1
-            except Exception as e:
-                logger.error(f"Failed to load {filename}: {e}")
-        else:
-            logger.warning(f"Model file missing: {filepath}")
+    for status in registry.status.values():
+        status.state = "loading"
+
+    def _load_all():
+        with ThreadPoolExecutor(max_workers=max(1, config.ML_MODEL_LOAD_WORKERS), thread_name_prefix="model-load") as pool:
+            list(pool.map(registry.load, MODEL_FILES))
+        loaded_count = sum(1 for s in registry.status.values() if s.state == "loaded")
+        logger.info(f"Model loading complete. {loaded_count}/{len(MODEL_FILES)} models loaded.")
 
-    logger.info(f"Model loading complete. {loaded_count}/{len(model_files)} models loaded.")
+    if block:
+        _load_all()
+    else:
+        threading.Thread(target=_load_all, name="model-loader", daemon=True).start()
 
 def get_registry() -> ModelRegistry:
     return registry
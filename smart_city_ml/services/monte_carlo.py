@@ -0,0 +1,85 @@
+from typing import Dict, Mapping, Sequence
+
+import numpy as np
+
+import config
+from services.feature_schema import CompiledModel
+
+
+def sample(distribution, n: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw `n` values from one of the distributions in schemas/simulation.py."""
+    kind = distribution.kind
+    if kind == "constant":
+        values = np.full(n, distribution.value, dtype=np.float64)
+    elif kind == "uniform":
+        values = rng.uniform(distribution.low, distribution.high, n)
+    elif kind == "normal":
+        values = rng.normal(distribution.mean, distribution.std, n)
+    elif kind == "lognormal":
+        values = rng.lognormal(distribution.mean, distribution.sigma, n)
+    elif kind == "triangular":
+        values = rng.triangular(distribution.low, distribution.mode, distribution.high, n)
+    elif kind == "choice":
+        weights = None
+        if distribution.weights is not None:
+            weights = np.asarray(distribution.weights, dtype=np.float64)
+            weights = weights / weights.sum()
+        values = rng.choice(np.asarray(distribution.values, dtype=np.float64), size=n, p=weights)
+    else:
+        raise ValueError(f"Unknown distribution '{kind}'")
+
+    if distribution.min is not None or distribution.max is not None:
+        values = np.clip(values, distribution.min, distribution.max)
+    return values
+
+def integer_fields(model: CompiledModel) -> set:
+    """Schema fields declared as int on the request model; their samples are rounded like real requests."""
+    fields = model.schema.request_model.model_fields
+    return {name for name in model.schema.fields if fields[name].annotation is int}
+
+
+def simulate(model: CompiledModel, inputs: Mapping, trials: int, seed: int, regression: bool,
+             chunk_rows: int = config.ML_MONTECARLO_CHUNK_ROWS):
+    """
+    Sample `trials` feature rows and predict them `chunk_rows` at a time (runs on an executor thread).
+
+    Only one chunk's feature matrix exists at a time. Classifiers return {class: count};
+    regressors return the float32 predictions (4 bytes per trial), which the summary
+    needs for exact quantiles. Results depend only on the seed and chunk size.
+    """
+    rng = np.random.default_rng(seed)
+    fields = model.schema.fields
+    rounded = integer_fields(model)
+    chunk_rows = max(1, chunk_rows)
+
+    values = np.empty(trials, dtype=np.float32) if regression else None
+    counts: Dict = {}
+    features = np.empty((min(chunk_rows, trials), len(fields)), dtype=np.float32)
+    for start in range(0, trials, chunk_rows):
+        n = min(chunk_rows, trials - start)
+        chunk = features[:n]
+        for column, field in enumerate(fields):
+            sampled = sample(inputs[field], n, rng)
+            chunk[:, column] = np.rint(sampled) if field in rounded else sampled
+
+        predictions = model.predict_matrix(chunk)
+        if regression:
+            values[start:start + n] = predictions
+        else:
+            labels, label_counts = np.unique(predictions, return_counts=True)
+            for label, count in zip(labels.tolist(), label_counts.tolist()):
+                counts[label] = counts.get(label, 0) + count
+    return values if regression else counts
+
+def summarize(values: np.ndarray, quantiles: Sequence[float], bins: int) -> Dict:
+    """Mean, spread, requested quantiles (keyed like `p5`, `p97.5`) and a histogram of the outputs."""
+    as_float = values.astype(np.float64)
+    counts, edges = np.histogram(as_float, bins=bins)
+    return {
+        "mean": float(as_float.mean()),
+        "std": float(as_float.std()),
+        "min": float(as_float.min()),
+        "max": float(as_float.max()),
+        "quantiles": {f"p{q * 100:g}": float(v) for q, v in zip(quantiles, np.quantile(as_float, quantiles))},
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
@@ -0,0 +1,60 @@
+from typing import Dict, List, Optional
+
+# smaps_rollup fields (kB) reported for each process, as bytes
+_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_clean_bytes",
+    "Shared_Dirty": "shared_dirty_bytes",
+    "Private_Clean": "private_clean_bytes",
+    "Private_Dirty": "private_dirty_bytes",
+}
+
+
+def memory_usage(pid: int) -> Optional[Dict[str, int]]:
+    """
+    RSS split into shared and private bytes for one process, from /proc/<pid>/smaps_rollup.
+    PSS charges each shared page to its sharers in proportion, so the PSS of all workers
+    adds up to their real combined footprint. Returns None where /proc is unavailable
+    or the process has exited.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    usage = {"pid": pid}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        if name in _FIELDS:
+            usage[_FIELDS[name]] = int(rest.split()[0]) * 1024
+    usage["shared_bytes"] = usage.get("shared_clean_bytes", 0) + usage.get("shared_dirty_bytes", 0)
+    usage["private_bytes"] = usage.get("private_clean_bytes", 0) + usage.get("private_dirty_bytes", 0)
+    return usage
+
+def _cmdline(pid: int) -> Optional[bytes]:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def forked_children(pid: int) -> List[int]:
+    """
+    Children of `pid` running the same program, i.e. the pre-fork parent's workers rather
+    than helpers such as multiprocessing's resource tracker. Empty if /proc does not list children.
+    """
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+    program = _cmdline(pid)
+    return [child for child in children if _cmdline(child) == program]
+
+def format_usage(usage: Dict[str, int]) -> str:
+    mb = lambda key: usage.get(key, 0) / (1024 * 1024)
+    shared_pct = 100 * usage.get("shared_bytes", 0) / usage["rss_bytes"] if usage.get("rss_bytes") else 0.0
+    return (f"pid {usage['pid']}: RSS {mb('rss_bytes'):.1f} MB, shared {mb('shared_bytes'):.1f} MB "
+            f"({shared_pct:.0f}%), private {mb('private_bytes'):.1f} MB, PSS {mb('pss_bytes'):.1f} MB")
@@ -0,0 +1,228 @@
+import asyncio
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger("smart_city_ml")
+
+# Profile ids are file names in the ring buffer directory, so lookups are restricted to this shape
+PROFILE_ID_PATTERN = r"^[0-9]{8}T[0-9]{6}-[0-9]+-[0-9]+$"
+
+PROFILE_SUFFIX = ".prof"
+META_SUFFIX = ".json"
+
+
+class ProfileSession:
+    """
+    cProfile capture of one request across threads.
+
+    The middleware profiles the event-loop thread; executor calls made on behalf of the
+    request (pandas slicing, XGBoost, Prophet) are profiled on their worker threads via
+    `wrap` and merged into the same stats. Other requests' event-loop work interleaved
+    with the profiled one is captured too, so profile on a quiet worker when possible.
+    Micro-batched model calls (services/micro_batcher.py) are shared by several requests
+    and run outside every request's context, so they are not part of any profile.
+    """
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def wrap(self, fn: Callable) -> Callable:
+        """`fn` profiled on whichever thread calls it, with the session active there."""
+        def _profiled(*args, **kwargs):
+            token = _active.set(self)
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+                _active.reset(token)
+                with self._lock:
+                    if not self.closed:
+                        self._thread_profiles.append(profile)
+        return _profiled
+
+    def stats(self) -> pstats.Stats:
+        """Merged stats; worker calls still running when the request ends are left out."""
+        with self._lock:
+            self.closed = True
+            thread_profiles = list(self._thread_profiles)
+        stats = pstats.Stats(self.profile)
+        for profile in thread_profiles:
+            stats.add(profile)
+        return stats
+
+
+_active: "contextvars.ContextVar[Optional[ProfileSession]]" = contextvars.ContextVar("profile_session", default=None)
+
+def current_session() -> Optional[ProfileSession]:
+    """The profile session of the request being handled, if it is being profiled."""
+    return _active.get()
+
+def profiling_enabled() -> bool:
+    """
+    Profiles expose code paths and timings and profiling costs CPU, so ML_PROFILING_ENABLED
+    only takes effect with ML_ADMIN_TOKEN set: the token is then required both to
+    trigger a profile by header and to read the stored profiles.
+    """
+    return config.ML_PROFILING_ENABLED and bool(config.ML_ADMIN_TOKEN)
+
+
+class ProfileStore:
+    """
+    Bounded on-disk ring buffer of request profiles: a pstats file (readable with
+    `python -m pstats` or snakeviz) and a JSON summary per profile. Once more than
+    `max_profiles` are stored the oldest are deleted. Ids sort by time and include the
+    pid, so pre-forked workers can share one directory.
+    """
+    def __init__(self, directory: str = config.ML_PROFILING_DIR, max_profiles: int = config.ML_PROFILING_MAX_PROFILES):
+        self.directory = directory
+        self.max_profiles = max(1, max_profiles)
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def new_id(self) -> str:
+        with self._lock:
+            self._counter += 1
+            counter = self._counter
+        return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{os.getpid()}-{counter}"
+
+    def path(self, profile_id: str, suffix: str = PROFILE_SUFFIX) -> str:
+        if not re.match(PROFILE_ID_PATTERN, profile_id):
+            raise ValueError(f"Invalid profile id '{profile_id}'")
+        return os.path.join(self.directory, profile_id + suffix)
+
+    def save(self, profile_id: str, stats: pstats.Stats, meta: Dict):
+        os.makedirs(self.directory, exist_ok=True)
+        stats.dump_stats(self.path(profile_id))
+        # Written last: a profile is listed only once both files exist
+        with open(self.path(profile_id, META_SUFFIX), "w") as f:
+            json.dump(meta, f)
+        self._trim()
+
+    def _ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        # Ids start with the timestamp, then pid and counter; oldest first
+        ids = [name[:-len(META_SUFFIX)] for name in names if name.endswith(META_SUFFIX)]
+        return sorted(ids, key=lambda i: (i.split("-")[0], int(i.split("-")[1]), int(i.split("-")[2])))
+
+    def _trim(self):
+        for profile_id in self._ids()[:-self.max_profiles]:
+            for suffix in (META_SUFFIX, PROFILE_SUFFIX):
+                try:
+                    os.remove(self.path(profile_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict]:
+        """Summaries of the stored profiles, newest first."""
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(self.path(profile_id, META_SUFFIX)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                # Trimmed by another worker meanwhile
+                continue
+        return profiles
+
+    def report(self, profile_id: str, sort: str = "cumulative", limit: int = 40) -> str:
+        """pstats text report of one profile; raises FileNotFoundError if it is not stored."""
+        buffer = io.StringIO()
+        stats = pstats.Stats(self.path(profile_id), stream=buffer)
+        stats.sort_stats(sort).print_stats(limit)
+        return buffer.getvalue()
+
+
+profile_store = ProfileStore()
+
+def get_profile_store() -> ProfileStore:
+    return profile_store
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware profiling requests that carry ML_PROFILING_HEADER together with
+    the admin token, or are picked at ML_PROFILING_SAMPLE_RATE; only installed when
+    profiling_enabled(). One request per worker is profiled at a time. Requests
+    that are not profiled pay one header scan and one random draw. The profile id is
+    returned in the X-Profile-Id response header.
+    """
+    def __init__(self, app, store: Optional[ProfileStore] = None):
+        self.app = app
+        self.store = store or profile_store
+        self.header = config.ML_PROFILING_HEADER.lower().encode("latin-1")
+        self.sample_rate = config.ML_PROFILING_SAMPLE_RATE
+        self._busy = threading.Lock()
+
+    def _trigger(self, scope) -> Optional[str]:
+        headers = scope["headers"]
+        if any(name == self.header for name, _ in headers):
+            token = config.ML_ADMIN_TOKEN.encode("latin-1")
+            return "header" if any(name == b"x-admin-token" and value == token for name, value in headers) else None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(("/admin", "/metrics")):
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession()
+        profile_id = self.store.new_id()
+        status = [500]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        token = _active.set(session)
+        started = time.perf_counter()
+        session.profile.enable()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            session.profile.disable()
+            seconds = time.perf_counter() - started
+            _active.reset(token)
+            self._busy.release()
+            meta = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status[0],
+                "seconds": round(seconds, 6),
+                "trigger": trigger,
+                "pid": os.getpid(),
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }
+            try:
+                await asyncio.to_thread(self.store.save, profile_id, session.stats(), meta)
+                logger.info(f"Profiled {scope['method']} {scope['path']} ({seconds * 1000:.1f} ms) as {profile_id}")
+            except Exception as e:
+                logger.error(f"Could not store profile {profile_id}: {e}")
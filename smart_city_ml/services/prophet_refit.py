@@ -0,0 +1,187 @@
+import inspect
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import joblib
+import pandas as pd
+from prophet import Prophet
+
+import config
+from services.metrics import MODEL_REFIT_SECONDS, MODEL_REFITS
+from services.model_loader import ModelRegistry, registry
+from services.series_store import SeriesStore
+
+logger = logging.getLogger("smart_city_ml")
+
+# Ingestion series -> the Prophet model refit from it
+SERIES_MODELS = {
+    "aqi": "aqi_model",
+    "water": "water_model",
+}
+
+# Constructor arguments that are not model settings
+_NOT_SETTINGS = ("self", "stan_backend", "changepoints")
+_DEFAULT_SEASONALITIES = ("yearly", "weekly", "daily")
+
+
+def unfitted_copy(model: Prophet) -> Prophet:
+    """A new Prophet with the fitted model's settings and custom seasonalities, ready to fit."""
+    settings = {
+        name: getattr(model, name)
+        for name in inspect.signature(Prophet.__init__).parameters
+        if name not in _NOT_SETTINGS and hasattr(model, name)
+    }
+    # After fitting, `changepoints` holds the automatically placed ones; only explicit ones carry over
+    if model.specified_changepoints:
+        settings["changepoints"] = model.changepoints
+    copy = Prophet(**settings)
+    for name, props in model.seasonalities.items():
+        if name not in _DEFAULT_SEASONALITIES:
+            copy.add_seasonality(name=name, period=props["period"], fourier_order=props["fourier_order"],
+                                 prior_scale=props["prior_scale"], mode=props["mode"],
+                                 condition_name=props["condition_name"])
+    return copy
+
+def warm_start_params(model: Prophet) -> Dict:
+    """The fitted model's MAP parameters, in the form Prophet.fit(init=...) expects."""
+    params = {name: float(model.params[name][0][0]) for name in ("k", "m", "sigma_obs")}
+    params.update({name: model.params[name][0] for name in ("delta", "beta")})
+    return params
+
+def refit(model: Prophet, history: pd.DataFrame) -> Prophet:
+    """
+    Fit a copy of `model` on `history`, starting the optimizer at the model's current
+    parameters instead of Prophet's default guess. Parameters whose shape no longer
+    matches (e.g. a different number of changepoints) fall back to the default.
+    """
+    if model.extra_regressors:
+        raise ValueError("models with extra regressors cannot be refit from (ds, y) observations alone")
+    return unfitted_copy(model).fit(history, init=warm_start_params(model))
+
+def _atomic_dump(model, path: str):
+    """Same as train_real_models.py: the hot-reload never sees a partial artifact."""
+    tmp_path = path + ".tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class RefitStatus:
+    """Progress of one model's online refits, as reported by GET /observations/{series}."""
+    def __init__(self):
+        self.state = "idle"  # idle | scheduled | running
+        self.finished_at: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.rows: Optional[int] = None
+        self.version: Optional[str] = None
+        self.error: Optional[str] = None
+
+
+class RefitScheduler:
+    """
+    Refits the Prophet models in the background after new observations arrive.
+
+    The first observation for a series schedules a refit `delay` seconds later, so a
+    burst of posts is folded into one fit; observations arriving during a refit
+    schedule another one after it. The refit fits the trailing `window_days` of the
+    stored series warm-started from the serving model, writes the artifact to the
+    models directory and hot-reloads it, which also refreshes the forecast cache.
+    Other workers pick the artifact up through their model watcher.
+    """
+    def __init__(self, registry: ModelRegistry, store: SeriesStore,
+                 delay: float = config.ML_REFIT_DELAY, window_days: int = config.ML_REFIT_WINDOW_DAYS):
+        self.registry = registry
+        self.store = store
+        self.delay = delay
+        self.window_days = window_days
+        self.status = {series: RefitStatus() for series in SERIES_MODELS}
+        self._lock = threading.Lock()
+        self._timers: Dict[str, threading.Timer] = {}
+        self._rerun = set()
+
+    def schedule(self, series: str):
+        with self._lock:
+            status = self.status[series]
+            if status.state == "running":
+                self._rerun.add(series)
+                return
+            if series in self._timers:
+                return
+            timer = threading.Timer(self.delay, self._run, args=(series,))
+            timer.name = f"prophet-refit-{series}"
+            timer.daemon = True
+            self._timers[series] = timer
+            status.state = "scheduled"
+            timer.start()
+
+    def _run(self, series: str):
+        with self._lock:
+            self._timers.pop(series, None)
+            self.status[series].state = "running"
+        try:
+            self.refit_now(series)
+        except Exception as e:
+            MODEL_REFITS.labels(SERIES_MODELS[series], "failed").inc()
+            self.status[series].error = str(e)
+            logger.error(f"Online refit of {SERIES_MODELS[series]} failed: {e}")
+        finally:
+            with self._lock:
+                self.status[series].state = "idle"
+                rerun = series in self._rerun
+                self._rerun.discard(series)
+            if rerun:
+                self.schedule(series)
+
+    def refit_now(self, series: str) -> bool:
+        """Refit and install one model synchronously; returns True if a new version now serves."""
+        attr = SERIES_MODELS[series]
+        status = self.status[series]
+        # Runs on a background thread, so a lazy (or still running eager) load may block here
+        self.registry.load(attr)
+        model, _ = self.registry.checkout(attr)
+        if model is None:
+            MODEL_REFITS.labels(attr, "skipped").inc()
+            status.error = f"{attr} is not loaded; there are no parameters to warm-start from"
+            logger.warning(f"Skipping online refit: {status.error}")
+            return False
+
+        started = time.perf_counter()
+        history = self.store.load(series, self.window_days)
+        loaded = time.perf_counter()
+        new_model = refit(model, history)
+        fitted = time.perf_counter()
+        _atomic_dump(new_model, self.registry.artifact_path(attr))
+        installed = self.registry.reload(attr)
+        finished = time.perf_counter()
+
+        MODEL_REFIT_SECONDS.labels(attr, "load").observe(loaded - started)
+        MODEL_REFIT_SECONDS.labels(attr, "fit").observe(fitted - loaded)
+        MODEL_REFIT_SECONDS.labels(attr, "install").observe(finished - fitted)
+        status.finished_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        status.seconds = round(finished - started, 4)
+        status.rows = len(history)
+        status.version = self.registry.status[attr].version
+        status.error = None if installed else self.registry.status[attr].error
+        MODEL_REFITS.labels(attr, "installed" if installed else "failed").inc()
+        logger.info(f"Online refit of {attr} on {len(history)} days took {status.seconds:.2f}s "
+                    f"(fit {fitted - loaded:.2f}s), serving {status.version}")
+        return installed
+
+    def stop(self):
+        """Cancel refits that have not started yet (running ones finish in the background)."""
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            for status in self.status.values():
+                if status.state == "scheduled":
+                    status.state = "idle"
+
+
+refits = RefitScheduler(registry, SeriesStore())
+
+def get_refits() -> RefitScheduler:
+    return refits
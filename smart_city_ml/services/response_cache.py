@@ -0,0 +1,128 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import config
+from services.feature_schema import FEATURE_SCHEMAS
+from services.metrics import RESPONSE_CACHE_LOOKUPS, RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_HIT_RATIO
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """
+    LRU (and optionally TTL) cache of one tabular model's per-row results.
+
+    Requests are first snapped to their quantization buckets; the key is the model
+    version plus the quantized feature values, so a hot reload (or a zone model with
+    a different artifact) never reuses another version's answers. Only used from the
+    event loop, so it needs no locking.
+    """
+    def __init__(self, model_name: str, quanta: Dict[str, float],
+                 max_entries: int = config.ML_RESPONSE_CACHE_SIZE, ttl: float = config.ML_RESPONSE_CACHE_TTL):
+        self.model_name = model_name
+        self.fields = FEATURE_SCHEMAS[model_name].fields
+        unknown = set(quanta) - set(self.fields)
+        if unknown:
+            raise ValueError(f"{model_name} has no features {sorted(unknown)} to quantize")
+        self.quanta = {field: step for field, step in quanta.items() if step > 0}
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, request):
+        """Copy of `request` with every quantized field rounded to the nearest multiple of its step."""
+        if not self.quanta:
+            return request
+        update = {}
+        for field, step in self.quanta.items():
+            value = getattr(request, field)
+            snapped = round(value / step) * step
+            # Keep integer fields (e.g. vehicle_count) integral
+            update[field] = int(snapped) if isinstance(value, int) else round(snapped, 9)
+        return request.model_copy(update=update)
+
+    def _key(self, version: str, request) -> Tuple:
+        return (version,) + tuple(getattr(request, field) for field in self.fields)
+
+    def _get(self, key: Tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        stored_at, value = entry
+        if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: Tuple, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def resolve(self, version: str, requests: Sequence,
+                      compute: Callable[[List], Awaitable[Sequence]]) -> List:
+        """
+        Results for `requests` in order: cached ones directly, the rest from one
+        `compute(quantized misses)` call whose results are then cached.
+        """
+        quantized = [self.quantize(r) for r in requests]
+        keys = [self._key(version, r) for r in quantized]
+        results = [self._get(key) for key in keys]
+        # Rows of one batch that fall in the same bucket are computed once
+        missing: Dict[Tuple, int] = {}
+        for i, value in enumerate(results):
+            if value is _MISSING:
+                missing.setdefault(keys[i], i)
+
+        hits = len(results) - len(missing)
+        self.hits += hits
+        self.misses += len(missing)
+        if hits:
+            RESPONSE_CACHE_LOOKUPS.labels(self.model_name, "hit").inc(hits)
+        if missing:
+            RESPONSE_CACHE_LOOKUPS.labels(self.model_name, "miss").inc(len(missing))
+            computed = dict(zip(missing, await compute([quantized[i] for i in missing.values()])))
+            for key, value in computed.items():
+                self._put(key, value)
+            results = [computed[key] if value is _MISSING else value for key, value in zip(keys, results)]
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "quanta": self.quanta,
+        }
+
+    def clear(self):
+        self._entries.clear()
+
+
+_caches: Dict[str, ResponseCache] = {}
+
+def get_response_cache(model_name: str) -> Optional[ResponseCache]:
+    """The model's response cache, or None when ML_RESPONSE_CACHE_ENABLED is off."""
+    if not config.ML_RESPONSE_CACHE_ENABLED:
+        return None
+    cache = _caches.get(model_name)
+    if cache is None:
+        cache = _caches[model_name] = ResponseCache(model_name, config.ML_RESPONSE_CACHE_QUANTA.get(model_name, {}))
+    return cache
+
+def get_response_caches() -> Dict[str, ResponseCache]:
+    return _caches
+
+RESPONSE_CACHE_ENTRIES.set_function(lambda: {(name,): len(cache._entries) for name, cache in _caches.items()})
+RESPONSE_CACHE_HIT_RATIO.set_function(lambda: {
+    (name,): cache.hits / (cache.hits + cache.misses) for name, cache in _caches.items() if cache.hits + cache.misses
+})
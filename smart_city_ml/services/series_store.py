@@ -0,0 +1,58 @@
+import os
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+
+import config
+
+SERIES_COLUMNS = ["ds", "y"]
+
+
+class SeriesStore:
+    """
+    Daily (ds, y) observations per series, persisted as one append-only CSV each.
+
+    Appends write only the new rows. A later observation for a day that is already
+    stored replaces it when the series is read, so corrections can simply be re-posted.
+    """
+    def __init__(self, directory: str = config.ML_SERIES_DIR):
+        self.directory = directory
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.csv")
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self.path(name))
+
+    def append(self, name: str, observations: pd.DataFrame, seed: Optional[pd.DataFrame] = None) -> int:
+        """
+        Append `observations` to the series and return the rows written. A series that does
+        not exist yet is first seeded with `seed`, e.g. the serving model's training history.
+        """
+        with self._lock_for(name):
+            path = self.path(name)
+            frames = [observations[SERIES_COLUMNS]]
+            if not os.path.exists(path):
+                os.makedirs(self.directory, exist_ok=True)
+                if seed is not None:
+                    frames.insert(0, seed[SERIES_COLUMNS])
+            rows = pd.concat(frames, ignore_index=True)
+            rows.to_csv(path, mode="a", header=not os.path.exists(path), index=False, date_format="%Y-%m-%d")
+            return len(rows)
+
+    def load(self, name: str, window_days: int = 0) -> pd.DataFrame:
+        """The series sorted by day, one row per day; only the latest `window_days` stored days when > 0."""
+        with self._lock_for(name):
+            series = pd.read_csv(self.path(name), parse_dates=["ds"])
+        series = series.drop_duplicates("ds", keep="last").sort_values("ds", ignore_index=True)
+        if window_days > 0:
+            # Counted in stored days rather than calendar days, so a gap in the feed never shrinks the fit
+            series = series.tail(window_days)
+        return series.reset_index(drop=True)
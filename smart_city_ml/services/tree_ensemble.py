@@ -0,0 +1,268 @@
+import json
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger("smart_city_ml")
+
+# Objectives whose output transform the evaluator reproduces
+_IDENTITY_OBJECTIVES = ("reg:squarederror", "reg:linear", "reg:absoluteerror", "reg:pseudohubererror")
+_LOGISTIC_OBJECTIVES = ("binary:logistic", "reg:logistic")
+_SOFTMAX_OBJECTIVES = ("multi:softprob", "multi:softmax")
+SUPPORTED_OBJECTIVES = _IDENTITY_OBJECTIVES + _LOGISTIC_OBJECTIVES + _SOFTMAX_OBJECTIVES
+
+# Trees are padded to complete binary trees, so memory grows as 2 ** depth per tree
+MAX_DEPTH = 12
+
+# Suffix of the flattened artifact written next to each XGBoost `.pkl`
+TREES_SUFFIX = ".trees.npz"
+
+
+class TreeEnsemble:
+    """
+    An XGBoost gbtree model flattened into dense NumPy arrays.
+
+    Every tree is padded to a complete binary tree of the ensemble's maximum depth
+    and stored in heap order, so the child of internal node `i` is `2i + 1` (left)
+    or `2i + 2` (right) and no child pointers are needed. Leaves shallower than
+    the maximum depth get pass-through splits above copies of their value.
+    `predict` walks every tree for every row at once, one vectorized step per
+    level. Outputs match `Booster.inplace_predict`: probabilities for
+    classifiers, values for regressors.
+    """
+    def __init__(
+        self,
+        split_feature: np.ndarray,
+        threshold: np.ndarray,
+        default_left: np.ndarray,
+        leaf_value: np.ndarray,
+        tree_group: np.ndarray,
+        base_margin: float,
+        n_groups: int,
+        max_depth: int,
+        objective: str,
+        feature_names: Optional[List[str]],
+        n_features: int,
+        classes: Optional[np.ndarray] = None,
+    ):
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective '{objective}'")
+        self.split_feature = split_feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.tree_group = tree_group
+        self.base_margin = base_margin
+        self.n_groups = n_groups
+        self.max_depth = max_depth
+        self.objective = objective
+        self.feature_names = feature_names
+        self.n_features = n_features
+        self.classes_ = classes
+
+        self.n_trees = split_feature.shape[0]
+        n_internal = split_feature.shape[1]
+        # Offsets turn (tree, node) pairs into indices of the flattened arrays
+        # (np.intp, so fancy indexing never has to convert them)
+        self._internal_offsets = (np.arange(self.n_trees, dtype=np.intp) * n_internal)[None, :]
+        self._child_step = 1 - self._internal_offsets
+        # After the last level `node` is offset + heap position, and leaves start at heap position n_internal
+        self._leaf_offsets = (np.arange(self.n_trees, dtype=np.intp) * leaf_value.shape[1])[None, :] \
+            - self._internal_offsets - n_internal
+        self._split_feature = split_feature.ravel().astype(np.intp)
+        self._threshold = threshold.ravel()
+        self._default_right = ~default_left.ravel()
+        self._leaf_value = leaf_value.ravel()
+        # Sums each tree's leaf into its output group (class) with one matmul
+        self._group_matrix = np.zeros((self.n_trees, n_groups), dtype=np.float32)
+        self._group_matrix[np.arange(self.n_trees), tree_group] = 1.0
+
+    # ── EXPORT ─────────────────────────────────────────────────
+    @classmethod
+    def from_booster(cls, booster, classes: Optional[Sequence] = None, n_iterations: Optional[int] = None) -> "TreeEnsemble":
+        """Flatten a trained booster; `n_iterations` keeps only the first boosting rounds (early stopping)."""
+        learner = json.loads(booster.save_raw("json"))["learner"]
+        objective = learner["objective"]["name"]
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError(f"Only gbtree boosters can be flattened, got {learner['gradient_booster']['name']}")
+
+        model = learner["gradient_booster"]["model"]
+        trees = model["trees"]
+        tree_info = model["tree_info"]
+        if n_iterations is not None:
+            n_keep = model["iteration_indptr"][n_iterations]
+            trees, tree_info = trees[:n_keep], tree_info[:n_keep]
+
+        params = learner["learner_model_param"]
+        n_groups = max(1, int(params.get("num_class", "0")))
+        base_score = float(params["base_score"])
+        if objective in _LOGISTIC_OBJECTIVES:
+            base_margin = float(np.log(base_score / (1.0 - base_score)))
+        else:
+            base_margin = base_score
+
+        max_depth = max(_tree_depth(t["left_children"], t["right_children"]) for t in trees)
+        if max_depth > MAX_DEPTH:
+            raise ValueError(f"Trees of depth {max_depth} exceed the supported depth {MAX_DEPTH}")
+
+        n_internal, n_leaves = 2 ** max_depth - 1, 2 ** max_depth
+        split_feature = np.zeros((len(trees), n_internal), dtype=np.int32)
+        # Pass-through splits (+inf threshold, default left) send every row left
+        threshold = np.full((len(trees), n_internal), np.inf, dtype=np.float32)
+        default_left = np.ones((len(trees), n_internal), dtype=bool)
+        leaf_value = np.zeros((len(trees), n_leaves), dtype=np.float32)
+
+        for i, tree in enumerate(trees):
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported")
+            stack = [(0, 0, 0)]  # (xgboost node, heap position, depth)
+            while stack:
+                node, heap, depth = stack.pop()
+                if tree["left_children"][node] == -1:
+                    # XGBoost stores leaf outputs in split_conditions
+                    span = 2 ** (max_depth - depth)
+                    first_leaf = heap * span + span - 1 - n_internal
+                    leaf_value[i, first_leaf:first_leaf + span] = tree["split_conditions"][node]
+                    continue
+                split_feature[i, heap] = tree["split_indices"][node]
+                threshold[i, heap] = tree["split_conditions"][node]
+                default_left[i, heap] = bool(tree["default_left"][node])
+                stack.append((tree["left_children"][node], 2 * heap + 1, depth + 1))
+                stack.append((tree["right_children"][node], 2 * heap + 2, depth + 1))
+
+        return cls(
+            split_feature, threshold, default_left, leaf_value,
+            tree_group=np.asarray(tree_info, dtype=np.int32),
+            base_margin=base_margin,
+            n_groups=n_groups,
+            max_depth=max_depth,
+            objective=objective,
+            feature_names=booster.feature_names,
+            n_features=booster.num_features(),
+            classes=None if classes is None else np.asarray(classes),
+        )
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            split_feature=self.split_feature,
+            threshold=self.threshold,
+            default_left=self.default_left,
+            leaf_value=self.leaf_value,
+            tree_group=self.tree_group,
+            meta=np.array(json.dumps({
+                "base_margin": self.base_margin,
+                "n_groups": self.n_groups,
+                "max_depth": self.max_depth,
+                "objective": self.objective,
+                "feature_names": self.feature_names,
+                "n_features": self.n_features,
+            })),
+            classes=self.classes_ if self.classes_ is not None else np.array([]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "TreeEnsemble":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            classes = data["classes"]
+            return cls(
+                data["split_feature"], data["threshold"], data["default_left"],
+                data["leaf_value"], data["tree_group"],
+                classes=classes if classes.size else None,
+                **meta,
+            )
+
+    # ── INFERENCE ──────────────────────────────────────────────
+    def predict_margin(self, features: np.ndarray) -> np.ndarray:
+        """Raw scores of shape (n_rows, n_groups) before the objective's transform."""
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        n_rows = features.shape[0]
+        flat_features = features.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * self.n_features)[:, None]
+        has_missing = bool(np.isnan(flat_features).any())
+
+        # `node` holds indices into the flattened internal-node arrays; in heap order the
+        # child of local node i is 2i + 1 + went_right, i.e. 2 * node + (1 - offset) + went_right
+        node = np.repeat(self._internal_offsets, n_rows, axis=0)
+        for _ in range(self.max_depth):
+            value = flat_features[row_offsets + self._split_feature[node]]
+            went_right = value >= self._threshold[node]
+            if has_missing:
+                missing = np.isnan(value)
+                went_right[missing] = self._default_right[node[missing]]
+            node *= 2
+            node += self._child_step
+            node += went_right
+
+        leaves = self._leaf_value[node + self._leaf_offsets]
+        return leaves @ self._group_matrix + np.float32(self.base_margin)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        margin = self.predict_margin(features)
+        if self.objective in _SOFTMAX_OBJECTIVES:
+            exp = np.exp(margin - margin.max(axis=1, keepdims=True))
+            return exp / exp.sum(axis=1, keepdims=True)
+        margin = margin[:, 0]
+        if self.objective in _LOGISTIC_OBJECTIVES:
+            return 1.0 / (1.0 + np.exp(-margin))
+        return margin
+
+
+def _tree_depth(left_children: List[int], right_children: List[int]) -> int:
+    depth, frontier = 0, [0]
+    while frontier:
+        frontier = [
+            child
+            for node in frontier if left_children[node] != -1
+            for child in (left_children[node], right_children[node])
+        ]
+        depth += 1 if frontier else 0
+    return depth
+
+
+def export_tree_ensemble(model, path: str, n_check_rows: int = 2000, seed: int = 0) -> TreeEnsemble:
+    """
+    Flatten a fitted XGBClassifier/XGBRegressor to `path` and verify parity.
+    Random rows (including missing values) spanning every split threshold are scored by
+    both the booster and the flattened ensemble; any disagreement aborts the export.
+    """
+    booster = model.get_booster()
+    try:
+        n_iterations = model.best_iteration + 1
+    except AttributeError:
+        n_iterations = None
+    ensemble = TreeEnsemble.from_booster(booster, classes=getattr(model, "classes_", None), n_iterations=n_iterations)
+
+    rng = np.random.default_rng(seed)
+    n_features = ensemble.n_features
+    real_split = np.isfinite(ensemble.threshold)
+    low = np.zeros(n_features, dtype=np.float32)
+    high = np.ones(n_features, dtype=np.float32)
+    for f in range(n_features):
+        used = ensemble.threshold[real_split & (ensemble.split_feature == f)]
+        if used.size:
+            span = max(float(used.max() - used.min()), 1.0)
+            low[f], high[f] = used.min() - 0.1 * span, used.max() + 0.1 * span
+    sample = rng.uniform(low, high, size=(n_check_rows, n_features)).astype(np.float32)
+    # Exact thresholds exercise the strict `<` comparison, NaNs the default directions
+    n_edge = n_check_rows // 4
+    thresholds = ensemble.threshold[real_split] if real_split.any() else np.zeros(1, dtype=np.float32)
+    sample[:n_edge] = np.where(
+        rng.random((n_edge, n_features)) < 0.5,
+        rng.choice(thresholds, size=(n_edge, n_features)),
+        np.nan,
+    )
+
+    expected = booster.inplace_predict(
+        sample, iteration_range=(0, n_iterations or 0), validate_features=False
+    )
+    actual = ensemble.predict(sample)
+    if not np.allclose(actual.reshape(expected.shape), expected, rtol=1e-4, atol=1e-5):
+        worst = float(np.max(np.abs(actual.reshape(expected.shape) - expected)))
+        raise ValueError(f"Flattened ensemble disagrees with booster.predict (max abs diff {worst:g})")
+
+    ensemble.save(path)
+    logger.info(f"Exported {ensemble.n_trees} trees (depth {ensemble.max_depth}) to {path}")
+    return ensemble
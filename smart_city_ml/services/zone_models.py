@@ -0,0 +1,232 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from services.metrics import (
+    MODEL_LOAD_SECONDS, MODEL_LOADS, ZONE_MODEL_LOOKUPS, ZONE_MODEL_EVICTIONS, ZONE_CACHE_BYTES, ZONE_CACHE_MODELS,
+)
+
+logger = logging.getLogger("smart_city_ml")
+
+ZoneKey = Tuple[str, str]  # (model attr, zone id)
+
+
+def _fingerprint(filepath: str) -> Tuple[int, int]:
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _ZoneEntry:
+    def __init__(self, loaded, filepath: str, fingerprint: Tuple[int, int], load_seconds: float):
+        self.loaded = loaded
+        self.filepath = filepath
+        self.fingerprint = fingerprint
+        # Artifact size on disk, the budget's proxy for the model's resident memory
+        self.nbytes = fingerprint[1]
+        self.load_seconds = load_seconds
+        self.last_used = time.time()
+
+
+class ZoneModelCache:
+    """
+    Zone-specific models keyed by (model attr, zone id), loaded on first use.
+
+    Entries are kept in LRU order and the least recently used are evicted once the
+    artifacts' total size exceeds `budget_bytes`; the entry just loaded is always kept.
+    Loads are single-flight per key, so a burst of requests for a cold zone model
+    unpickles it once. Evicted models are only dropped from the cache: requests that
+    already checked one out keep using it until they finish.
+
+    Zone ids come from clients, so nothing is kept per unknown zone for long: the
+    per-key load locks are dropped once no request holds them, and zones without an
+    artifact are remembered for `negative_ttl` seconds (or until the watcher's next
+    drop_stale()) in a bounded LRU of `negative_size` keys, as are artifacts that failed to load.
+    """
+    def __init__(self, registry, budget_bytes: float, negative_ttl: float = 30.0, negative_size: int = 10000):
+        self._registry = registry
+        self.budget_bytes = int(budget_bytes)
+        self.negative_ttl = negative_ttl
+        self.negative_size = max(1, negative_size)
+        self._entries: "OrderedDict[ZoneKey, _ZoneEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Per-key load lock and the number of requests holding or waiting on it
+        self._load_locks: Dict[ZoneKey, List] = {}
+        # Expiry (monotonic) of zones found without an artifact, so a miss costs no stat per request
+        self._missing: "OrderedDict[ZoneKey, float]" = OrderedDict()
+        # Fingerprint of artifacts that failed to load, so they are not retried on every request
+        self._failed: "OrderedDict[ZoneKey, Tuple[int, int]]" = OrderedDict()
+        self.resident_bytes = 0
+
+    @contextmanager
+    def _load_lock(self, key: ZoneKey):
+        with self._lock:
+            slot = self._load_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if slot[1] == 0:
+                    del self._load_locks[key]
+
+    def _remember(self, memo: OrderedDict, key: ZoneKey, value):
+        with self._lock:
+            memo.pop(key, None)
+            memo[key] = value
+            while len(memo) > self.negative_size:
+                memo.popitem(last=False)
+
+    def known_missing(self, attr: str, zone: str) -> bool:
+        """True if the zone recently had no artifact, so the city-wide model serves (never touches the disk)."""
+        key = (attr, zone)
+        with self._lock:
+            expires = self._missing.get(key)
+            if expires is None:
+                return False
+            if expires <= time.monotonic():
+                del self._missing[key]
+                return False
+        ZONE_MODEL_LOOKUPS.labels(attr, "fallback").inc()
+        return True
+
+    def lookup(self, attr: str, zone: str):
+        """Return the cached LoadedModel for the zone, or None on a miss (never blocks on a load)."""
+        key = (attr, zone)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry.last_used = time.time()
+        ZONE_MODEL_LOOKUPS.labels(attr, "hit").inc()
+        return entry.loaded
+
+    def load(self, attr: str, zone: str):
+        """
+        Load the zone's artifact into the cache (blocking; run off the event loop).
+        Returns None if the zone has no usable artifact, so the caller falls back
+        to the city-wide model.
+        """
+        key = (attr, zone)
+        with self._load_lock(key):
+            # Another request may have loaded it (or found it missing) while this one waited for the lock
+            loaded = self.lookup(attr, zone)
+            if loaded is not None or self.known_missing(attr, zone):
+                return loaded
+
+            filepath = self._registry.artifact_path(attr, self._registry.zone_dir(zone))
+            try:
+                fingerprint = _fingerprint(filepath)
+            except FileNotFoundError:
+                ZONE_MODEL_LOOKUPS.labels(attr, "fallback").inc()
+                if self.negative_ttl > 0:
+                    self._remember(self._missing, key, time.monotonic() + self.negative_ttl)
+                return None
+            if self._failed.get(key) == fingerprint:
+                ZONE_MODEL_LOOKUPS.labels(attr, "failed").inc()
+                return None
+
+            ZONE_MODEL_LOOKUPS.labels(attr, "miss").inc()
+            started = time.perf_counter()
+            try:
+                loaded = self._registry.load_artifact(attr, filepath)
+            except Exception as e:
+                MODEL_LOADS.labels(attr, "failed").inc()
+                self._remember(self._failed, key, fingerprint)
+                logger.error(f"Failed to load zone model {filepath}, serving the city-wide model: {e}")
+                return None
+            load_seconds = time.perf_counter() - started
+            MODEL_LOAD_SECONDS.labels(attr).observe(load_seconds)
+            MODEL_LOADS.labels(attr, "loaded").inc()
+            with self._lock:
+                self._failed.pop(key, None)
+
+            self._insert(key, _ZoneEntry(loaded, filepath, fingerprint, load_seconds))
+            logger.info(f"Loaded zone model {filepath} ({loaded.version}) in {load_seconds:.2f}s")
+            return loaded
+
+    def _insert(self, key: ZoneKey, entry: _ZoneEntry):
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.resident_bytes -= previous.nbytes
+            self._entries[key] = entry
+            self.resident_bytes += entry.nbytes
+            while self.resident_bytes > self.budget_bytes and len(self._entries) > 1:
+                old_key, old = self._entries.popitem(last=False)
+                self.resident_bytes -= old.nbytes
+                evicted.append(old_key)
+        for attr, zone in evicted:
+            ZONE_MODEL_EVICTIONS.labels(attr).inc()
+            logger.info(f"Evicted zone model {attr} for zone {zone} (zone cache over budget)")
+
+    def drop_stale(self) -> List[ZoneKey]:
+        """
+        Drop entries whose artifact changed or disappeared on disk, so the next request
+        loads the new version, and forget zones found without an artifact, so ones
+        deployed since are picked up (called by the registry's hot-reload watcher).
+        """
+        with self._lock:
+            self._missing.clear()
+            entries = list(self._entries.items())
+        stale = []
+        for key, entry in entries:
+            try:
+                changed = _fingerprint(entry.filepath) != entry.fingerprint
+            except FileNotFoundError:
+                changed = True
+            if changed:
+                stale.append(key)
+        with self._lock:
+            for key in stale:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.resident_bytes -= entry.nbytes
+        for attr, zone in stale:
+            logger.info(f"Zone model {attr} for zone {zone} changed on disk; it reloads on next use")
+        return stale
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._missing.clear()
+            self._failed.clear()
+            self.resident_bytes = 0
+
+    def snapshot(self) -> List[Dict]:
+        """Resident entries, most recently used last."""
+        with self._lock:
+            return [
+                {"model": attr, "zone": zone, "version": entry.loaded.version, "bytes": entry.nbytes,
+                 "load_seconds": round(entry.load_seconds, 4), "last_used": entry.last_used}
+                for (attr, zone), entry in self._entries.items()
+            ]
+
+    def model_counts(self) -> Dict[Tuple[str, ...], float]:
+        counts: Dict[Tuple[str, ...], float] = {}
+        with self._lock:
+            for attr, _ in self._entries:
+                counts[(attr,)] = counts.get((attr,), 0) + 1
+        return counts
+
+
+def batch_zone(requests: Sequence) -> Optional[str]:
+    """The zone shared by every request of a batch; a batch cannot mix zones."""
+    zones = {r.zone for r in requests}
+    if len(zones) > 1:
+        raise HTTPException(status_code=422, detail="All requests in a batch must target the same zone")
+    return zones.pop() if zones else None
+
+
+def register_zone_gauges(cache: ZoneModelCache):
+    ZONE_CACHE_BYTES.set_function(lambda: {(): cache.resident_bytes})
+    ZONE_CACHE_MODELS.set_function(cache.model_counts)
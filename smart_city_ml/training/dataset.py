@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("smart_city_ml")
+
+# Bump when generate_wide_dataset changes, so cached datasets from older code are not reused
+GENERATOR_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join("data", "cache")
+
+
+class DatasetParams:
+    """Generation parameters of the wide single-city daily dataset; they fully determine its content."""
+    def __init__(self, seed: int = 42, days: int = 2000, start: str = "2018-01-01"):
+        self.seed = seed
+        self.days = days
+        self.start = start
+
+    def as_dict(self) -> Dict:
+        return {"generator_version": GENERATOR_VERSION, "seed": self.seed, "days": self.days, "start": self.start}
+
+    def cache_key(self) -> str:
+        encoded = json.dumps(self.as_dict(), sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def generate_wide_dataset(params: DatasetParams) -> pd.DataFrame:
+    """
+    Correlated daily city metrics plus classification labels.
+    Draws from a RandomState seeded with `params.seed` in a fixed order, so the
+    output is identical to the original `np.random.seed(42)` script for the defaults.
+    """
+    rng = np.random.RandomState(params.seed)
+    days = params.days
+    dates = pd.date_range(start=params.start, periods=days)
+
+    # Background trends
+    annual_temp_cycle = np.sin(np.linspace(0, 2 * np.pi * (days/365.25), days)) * 10 + 25
+    long_term_deforestation = np.linspace(100, 115, days) # +15% over time
+    population_growth = np.linspace(1000, 1200, days)
+
+    # Core features
+    base_aqi = 100 + (population_growth / 20) + rng.normal(0, 15, days)
+    base_water = 80 - (population_growth / 50) + rng.normal(0, 5, days)
+
+    # Introduce correlation
+    traffic_density = base_aqi * 1.5 + rng.normal(0, 20, days)
+    industrial_emission = base_aqi * 0.8 + rng.normal(0, 10, days)
+    respiratory_cases = (base_aqi * 0.3) + rng.normal(0, 5, days)
+    water_stress_index = 100 - base_water + (annual_temp_cycle * 0.5)
+
+    df = pd.DataFrame({
+        'date': dates,
+        'aqi': np.clip(base_aqi, 0, 500),
+        'water_quality': np.clip(base_water, 0, 100),
+        'temperature': annual_temp_cycle,
+        'humidity': rng.uniform(30, 90, days),
+        'population_density': population_growth,
+        'traffic_density': np.clip(traffic_density, 0, 1000),
+        'industrial_emission': np.clip(industrial_emission, 0, 500),
+        'respiratory_cases': np.clip(respiratory_cases, 0, 200),
+        'water_stress_index': np.clip(water_stress_index, 0, 100),
+        'rainfall': rng.gamma(2, 2, days),
+        'urban_expansion_rate': rng.uniform(0.1, 2.5, days),
+        'forest_cover_ha': long_term_deforestation * 1000, # Mock scaling
+        'day_of_week': dates.dayofweek,
+    })
+
+    # Add derived labels/targets for classification
+    df['health_risk_label'] = rng.randint(0, 4, days) # 0: LOW, 1: MODERATE, 2: HIGH, 3: CRITICAL
+    df['traffic_status_label'] = rng.randint(0, 3, days) # 0: CLEAR, 1: MODERATE, 2: CONGESTED
+    return df
+
+
+# ── COLUMNAR FILES ─────────────────────────────────────────────
+def save_columns(df: pd.DataFrame, path: str, meta: Optional[Dict] = None):
+    """
+    Write a DataFrame as one uncompressed .npz with an array per column.
+    Written to a temporary name and renamed, so readers never see a partial file.
+    """
+    arrays = {f"col_{name}": df[name].to_numpy() for name in df.columns}
+    arrays["__meta__"] = np.array(json.dumps({"columns": list(df.columns), **(meta or {})}))
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+def load_columns(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Read a file written by save_columns; only the requested columns are read into memory."""
+    with np.load(path, allow_pickle=False) as data:
+        names = json.loads(str(data["__meta__"]))["columns"]
+        return pd.DataFrame({name: data[f"col_{name}"] for name in (columns or names)})
+
+
+def load_or_generate(params: DatasetParams, cache_dir: str = DEFAULT_CACHE_DIR,
+                     use_cache: bool = True) -> Tuple[pd.DataFrame, str, bool]:
+    """
+    Return (dataset, cache path, cache hit). The dataset is generated only when no
+    columnar file exists for the parameters' cache key.
+    """
+    path = os.path.join(cache_dir, f"wide-{params.cache_key()}.npz")
+    if use_cache and os.path.exists(path):
+        logger.info(f"Using cached dataset {path}")
+        return load_columns(path), path, True
+
+    df = generate_wide_dataset(params)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_columns(df, path, meta={"params": params.as_dict()})
+    logger.info(f"Generated {len(df)} rows and cached them at {path}")
+    return df, path, False